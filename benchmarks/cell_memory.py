@@ -0,0 +1,48 @@
+"""Measures the memory used per cell by the standard and compact storage.
+
+Usage: python benchmarks/cell_memory.py [rows] [columns] [versions]
+"""
+import sys
+import time
+import tracemalloc
+
+from happybase_mock import Connection
+
+
+def measure(compact, rows, columns, versions):
+    Connection._instances.clear()
+    conn = Connection()
+
+    tracemalloc.start()
+    conn.create_table('bench', {'d': {'max_versions': versions}},
+                      compact=compact)
+    table = conn.table('bench')
+    now = int(time.time() * 1000)
+    for ts in range(now, now + versions):
+        for i in range(rows):
+            # Build new bytes objects for every put, like decoded client
+            # requests would
+            data = {('d:col%d' % c).encode('utf-8'): b'value'
+                    for c in range(columns)}
+            table.put(('row%08d' % i).encode('utf-8'), data, timestamp=ts)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / float(rows * columns)
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else 100000
+    columns = int(argv[2]) if len(argv) > 2 else 10
+    max_versions = int(argv[3]) if len(argv) > 3 else 1
+
+    print('%d rows x %d columns' % (rows, columns))
+    print('%-10s %-10s %15s' % ('versions', 'storage', 'bytes/cell'))
+    for versions in sorted({1, max_versions}):
+        for compact in (False, True):
+            per_cell = measure(compact, rows, columns, versions)
+            print('%-10d %-10s %15.1f' % (
+                versions, 'compact' if compact else 'standard', per_cell))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
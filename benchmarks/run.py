@@ -0,0 +1,333 @@
+"""Throughput, latency and memory benchmarks of the Table operations.
+
+Usage: python benchmarks/run.py [options], see --help (Python 3 only)
+
+A table is loaded for every combination of --rows, --versions, --width and
+--storage, then each operation runs repeatedly on it until --ops operations
+or --time seconds. Reported are the operations per second, the 50th and 99th
+percentile latency, and the peak memory allocated while running the
+operation (measured in a separate run, as tracing slows it down).
+
+Results can be saved as a baseline with --save NAME, and compared against
+one with --compare NAME, which exits with status 1 if an operation got
+slower than its baseline by more than --threshold.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from happybase_mock import Connection, SqliteStorage
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'baselines')
+
+# Operations always run at least this many times, whatever --time is
+MIN_OPS = 5
+
+# Rows read by rows() and written by a batch in one operation
+MULTI_SIZE = 100
+
+OPERATIONS = ('load', 'put', 'row', 'rows', 'scan', 'batch', 'counter',
+              'scan_write')
+
+
+def row_key(i):
+    return ('row%08d' % i).encode('utf-8')
+
+
+class Fixture(object):
+
+    def __init__(self, rows, versions, width, columns, storage, tmpdir):
+        self.rows = rows
+        self.versions = versions
+        self.columns = [('d:c%d' % c).encode('utf-8')
+                        for c in range(columns)]
+        self.value = b'x' * width
+        self.storage = storage
+        self.tmpdir = tmpdir
+        self.random = random.Random(42)
+        self._tables = 0
+
+    def new_table(self):
+        # A new empty table, in its own connection
+        Connection._instances.clear()
+        conn = Connection()
+        kwargs = {}
+        if self.storage == 'compact':
+            kwargs['compact'] = True
+        elif self.storage == 'sqlite':
+            self._tables += 1
+            path = os.path.join(self.tmpdir, '%d.db' % self._tables)
+            kwargs['storage'] = SqliteStorage(path)
+        conn.create_table('bench', {'d': {'max_versions': self.versions},
+                                    'c': {}}, **kwargs)
+        return conn.table('bench')
+
+    def data(self):
+        return {column: self.value for column in self.columns}
+
+    def load(self, table):
+        for ts in range(1, self.versions + 1):
+            for i in range(self.rows):
+                table.put(row_key(i), self.data(), timestamp=ts)
+
+    def random_key(self):
+        return row_key(self.random.randrange(self.rows))
+
+
+def load_op(fixture):
+    # One operation loads a whole table
+    def op():
+        fixture.load(fixture.new_table())
+    return op
+
+
+def put_op(fixture, table):
+    def op():
+        table.put(fixture.random_key(), fixture.data())
+    return op
+
+
+def row_op(fixture, table):
+    def op():
+        table.row(fixture.random_key())
+    return op
+
+
+def rows_op(fixture, table):
+    def op():
+        table.rows([fixture.random_key() for _ in range(MULTI_SIZE)])
+    return op
+
+
+def scan_op(fixture, table, selectivity):
+    # Scans a random range holding the given fraction of the rows
+    span = max(1, int(fixture.rows * selectivity))
+
+    def op():
+        start = fixture.random.randrange(fixture.rows - span + 1)
+        for _ in table.scan(row_start=row_key(start),
+                            row_stop=row_key(start + span)):
+            pass
+    return op
+
+
+def scan_write_op(fixture, table):
+    # One operation scans the whole table, rewriting every row it reads,
+    # like a migration would
+    def op():
+        data = fixture.data()
+        for key, _ in table.scan():
+            table.put(key, data)
+    return op
+
+
+def batch_op(fixture, table):
+    def op():
+        with table.batch() as b:
+            for _ in range(MULTI_SIZE):
+                b.put(fixture.random_key(), fixture.data())
+    return op
+
+
+def counter_op(fixture, table):
+    def op():
+        table.counter_inc(fixture.random_key(), b'c:n')
+    return op
+
+
+def measure(op, max_ops, max_time):
+    # Latencies of the operation in seconds
+    timer = time.perf_counter
+    latencies = []
+    deadline = timer() + max_time
+    while len(latencies) < max_ops and (
+            len(latencies) < MIN_OPS or timer() < deadline):
+        start = timer()
+        op()
+        latencies.append(timer() - start)
+    return latencies
+
+
+def peak_memory(op, count):
+    # Peak memory allocated while running the operation count times
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(count):
+        op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def percentile(latencies, p):
+    ordered = sorted(latencies)
+    return ordered[int(round(p * (len(ordered) - 1)))]
+
+
+def run_benchmark(op, max_ops, max_time, memory):
+    latencies = measure(op, max_ops, max_time)
+    result = {
+        'ops': len(latencies),
+        'ops_per_sec': len(latencies) / sum(latencies),
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+    }
+    if memory:
+        result['peak_memory'] = peak_memory(op, min(len(latencies), 100))
+    return result
+
+
+def benchmarks(args, tmpdir):
+    # Yields (name, result) for every benchmark
+    for rows, versions, width, storage in itertools.product(
+            args.rows, args.versions, args.width, args.storage):
+        fixture = Fixture(rows, versions, width, args.columns, storage,
+                          tmpdir)
+        name = 'rows=%d versions=%d width=%d storage=%s' % (
+            rows, versions, width, storage)
+
+        if 'load' in args.only:
+            yield 'load %s' % name, run_benchmark(
+                load_op(fixture), 1, 0, args.memory)
+
+        table = fixture.new_table()
+        fixture.load(table)
+        ops = [
+            ('row', row_op(fixture, table)),
+            ('rows', rows_op(fixture, table)),
+        ]
+        ops.extend(('scan %s selectivity=%g' % (name, s),
+                    scan_op(fixture, table, s)) for s in args.selectivity)
+        # Writes go last, they change the table the reads run on
+        ops.extend([
+            ('put', put_op(fixture, table)),
+            ('batch', batch_op(fixture, table)),
+            ('counter', counter_op(fixture, table)),
+        ])
+        for label, op in ops:
+            if label.split()[0] not in args.only:
+                continue
+            if ' ' not in label:
+                label = '%s %s' % (label, name)
+            yield label, run_benchmark(op, args.ops, args.time, args.memory)
+
+        if 'scan_write' in args.only:
+            # Like load, a single operation takes long on big tables
+            yield 'scan_write %s' % name, run_benchmark(
+                scan_write_op(fixture, table), 1, 0, args.memory)
+
+
+def format_result(result):
+    line = '%12.1f %12.1f %12.1f' % (
+        result['ops_per_sec'], result['p50'] * 1e6, result['p99'] * 1e6)
+    if 'peak_memory' in result:
+        line += ' %12.1f' % (result['peak_memory'] / 1024.0)
+    else:
+        line += ' %12s' % '-'
+    return line
+
+
+def compare(result, baseline, threshold):
+    # Returns the comparison column, and whether it's a regression
+    if baseline is None:
+        return 'new', False
+    ratio = result['ops_per_sec'] / baseline['ops_per_sec']
+    regression = ratio < 1 - threshold
+    return '%6.2fx%s' % (ratio, ' SLOWER' if regression else ''), regression
+
+
+def baseline_path(name):
+    return os.path.join(BASELINES, '%s.json' % name)
+
+
+def parse_args(argv):
+    def numbers(type_):
+        return lambda s: [type_(v) for v in s.split(',')]
+
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the Table operations.')
+    parser.add_argument('--rows', type=numbers(int), default=[1000, 100000],
+                        help='table sizes, e.g. 1000,10000,1000000')
+    parser.add_argument('--versions', type=numbers(int), default=[1],
+                        help='versions per cell')
+    parser.add_argument('--width', type=numbers(int), default=[16],
+                        help='value sizes in bytes')
+    parser.add_argument('--columns', type=int, default=5,
+                        help='columns per row')
+    parser.add_argument('--selectivity', type=numbers(float),
+                        default=[0.001, 0.01, 0.1],
+                        help='fractions of the table read by a scan')
+    parser.add_argument('--storage', type=lambda s: s.split(','),
+                        default=['memory'],
+                        help='storages: memory, compact, sqlite')
+    parser.add_argument('--only', type=lambda s: s.split(','),
+                        default=list(OPERATIONS),
+                        help='operations: %s' % ','.join(OPERATIONS))
+    parser.add_argument('--ops', type=int, default=10000,
+                        help='maximum operations per benchmark')
+    parser.add_argument('--time', type=float, default=2.0,
+                        help='maximum seconds per benchmark')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="don't measure the peak memory")
+    parser.add_argument('--save', metavar='NAME',
+                        help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='NAME',
+                        help='compare the results with a baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown that counts as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+
+    print('%-70s %12s %12s %12s %12s %s' % (
+        'benchmark', 'ops/sec', 'p50 (us)', 'p99 (us)', 'peak (KiB)',
+        'vs baseline' if args.compare else ''))
+
+    results = {}
+    regressions = 0
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, result in benchmarks(args, tmpdir):
+            results[name] = result
+            line = '%-70s %s' % (name, format_result(result))
+            if args.compare:
+                column, regression = compare(
+                    result, baseline.get(name), args.threshold)
+                regressions += regression
+                line += ' ' + column
+            print(line)
+            sys.stdout.flush()
+    finally:
+        Connection._instances.clear()
+        shutil.rmtree(tmpdir)
+
+    if args.save:
+        if not os.path.isdir(BASELINES):
+            os.makedirs(BASELINES)
+        with open(baseline_path(args.save), 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print('%d benchmark(s) slower than the baseline' % regressions)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
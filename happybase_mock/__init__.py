@@ -4,5 +4,7 @@ __version__ = '0.10.0'
 
 from .batch import Batch
 from .connection import Connection, DEFAULT_HOST, DEFAULT_PORT
-from .pool import ConnectionPool
+from .pool import ConnectionPool, NoConnectionsAvailable
+from .scanner import Scanner
+from .storage import MemoryStorage, SqliteStorage, Storage
 from .table import Table
@@ -0,0 +1,181 @@
+"""asyncio API over Connection and Table, for Python 3.6+.
+
+Calls run directly on the event loop thread, as the in-memory tables answer
+without blocking on I/O. Pass an executor (e.g. for tables stored with
+SqliteStorage) to run them in it instead. Scans hand control back to the
+event loop between batches of rows.
+"""
+import asyncio
+import functools
+from itertools import islice
+
+from .connection import Connection
+
+
+class AsyncConnection(object):
+
+    def __init__(self, *args, executor=None, **kwargs):
+        self.connection = Connection(*args, **kwargs)
+        self._executor = executor
+
+    def table(self, name, use_prefix=True):
+        return AsyncTable(self.connection.table(name, use_prefix),
+                          self._executor)
+
+    async def open(self):
+        self.connection.open()
+
+    async def close(self):
+        self.connection.close()
+
+    async def tables(self):
+        return await _call(self._executor, self.connection.tables)
+
+    async def create_table(self, name, families, **kwargs):
+        await _call(self._executor, self.connection.create_table, name,
+                    families, **kwargs)
+
+    async def delete_table(self, name, disable=False):
+        await _call(self._executor, self.connection.delete_table, name,
+                    disable)
+
+    async def enable_table(self, name):
+        await _call(self._executor, self.connection.enable_table, name)
+
+    async def disable_table(self, name):
+        await _call(self._executor, self.connection.disable_table, name)
+
+    async def is_table_enabled(self, name):
+        return await _call(self._executor, self.connection.is_table_enabled,
+                           name)
+
+    async def compact_table(self, name, major=False):
+        await _call(self._executor, self.connection.compact_table, name,
+                    major)
+
+
+class AsyncTable(object):
+
+    def __init__(self, table, executor=None):
+        self.table = table
+        self.name = table.name
+        self._executor = executor
+
+    def __repr__(self):
+        return '<%s.%s name=%r>' % (
+            __name__,
+            self.__class__.__name__,
+            self.name,
+        )
+
+    async def families(self):
+        return await _call(self._executor, self.table.families)
+
+    async def regions(self):
+        return await _call(self._executor, self.table.regions)
+
+    async def row(self, row, columns=None, timestamp=None,
+                  include_timestamp=False):
+        return await _call(self._executor, self.table.row, row, columns,
+                           timestamp, include_timestamp)
+
+    async def rows(self, rows, columns=None, timestamp=None,
+                   include_timestamp=False, **kwargs):
+        return await _call(self._executor, self.table.rows, rows, columns,
+                           timestamp, include_timestamp, **kwargs)
+
+    async def cells(self, row, column, versions=None, timestamp=None,
+                    include_timestamp=False):
+        return await _call(self._executor, self.table.cells, row, column,
+                           versions, timestamp, include_timestamp)
+
+    def scan(self, row_start=None, row_stop=None, row_prefix=None,
+             columns=None, filter=None, timestamp=None,
+             include_timestamp=False, batch_size=1000, scan_batching=None,
+             limit=None, reverse=False, sorted_columns=False, **kwargs):
+        # Use with async for. Arguments are checked right away, like
+        # Table.scan() does.
+        scanner = self.table.scan(
+            row_start, row_stop, row_prefix, columns, filter, timestamp,
+            include_timestamp, batch_size, scan_batching, limit, reverse,
+            sorted_columns, **kwargs)
+        return self._scan(scanner, batch_size)
+
+    async def _scan(self, scanner, batch_size):
+        while True:
+            # Table.scan() reads batch_size rows at a time, take them in
+            # the same batches
+            rows = await _call(self._executor, _take, scanner, batch_size)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            # Let other tasks run before the next batch
+            await asyncio.sleep(0)
+
+    async def put(self, row, data, timestamp=None, wal=True):
+        await _call(self._executor, self.table.put, row, data, timestamp,
+                    wal)
+
+    async def delete(self, row, columns=None, timestamp=None, wal=True):
+        await _call(self._executor, self.table.delete, row, columns,
+                    timestamp, wal)
+
+    def batch(self, timestamp=None, batch_size=None, transaction=False,
+              wal=True):
+        # Use with async with
+        return AsyncBatch(
+            self.table.batch(timestamp, batch_size, transaction, wal),
+            self._executor)
+
+    async def counter_get(self, row, column):
+        return await _call(self._executor, self.table.counter_get, row,
+                           column)
+
+    async def counter_set(self, row, column, value=0):
+        await _call(self._executor, self.table.counter_set, row, column,
+                    value)
+
+    async def counter_inc(self, row, column, value=1):
+        return await _call(self._executor, self.table.counter_inc, row,
+                           column, value)
+
+    async def counter_dec(self, row, column, value=1):
+        return await _call(self._executor, self.table.counter_dec, row,
+                           column, value)
+
+
+class AsyncBatch(object):
+
+    def __init__(self, batch, executor=None):
+        self.batch = batch
+        self._executor = executor
+
+    async def send(self):
+        await _call(self._executor, self.batch.send)
+
+    async def put(self, row, data, wal=None):
+        # May send the batch, if it has a batch_size
+        await _call(self._executor, self.batch.put, row, data, wal)
+
+    async def delete(self, row, columns=None, wal=None):
+        await _call(self._executor, self.batch.delete, row, columns, wal)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await _call(self._executor, self.batch.__exit__, exc_type,
+                    exc_value, traceback)
+
+
+async def _call(executor, function, *args, **kwargs):
+    if executor is None:
+        return function(*args, **kwargs)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(function, *args, **kwargs))
+
+
+def _take(iterator, count):
+    return list(islice(iterator, count))
@@ -1,32 +1,75 @@
-import functools
+from .util import encode_columns, encode_data
 
 
 class Batch(object):
 
     def __init__(self, table, timestamp=None, batch_size=None,
                  transaction=False, wal=True):
+        if batch_size is not None:
+            if transaction:
+                raise TypeError("'transaction' cannot be used when "
+                                "'batch_size' is specified")
+            if not batch_size > 0:
+                raise ValueError("'batch_size' must be > 0")
+
         self._table = table
         self._timestamp = timestamp
-        self._partials = []
+        self._batch_size = batch_size
+        self._transaction = transaction
+
+        # key: row key, value: list of (data, columns) mutations in the order
+        # they were made, where data is None for deletes
+        self._mutations = {}
+        self._mutation_count = 0
 
     def send(self):
-        for p in self._partials:
-            p()
-        del self._partials[:]
+        if not self._mutations:
+            return
+
+        self._table._apply(self._mutations, self._timestamp,
+                           self._transaction)
+        self._reset_mutations()
+
+    def put(self, row, data, wal=None):
+        if not isinstance(row, bytes):
+            row = row.encode('utf-8')
+        data = encode_data(data)
 
-    def put(self, *args, **kwargs):
-        self._add_partial(self._table.put, *args, **kwargs)
+        ops = self._mutations.setdefault(row, [])
+        if ops and ops[-1][0] is not None:
+            # Merge consecutive puts on the same row
+            ops[-1][0].update(data)
+        else:
+            ops.append((data, None))
 
-    def delete(self, *args, **kwargs):
-        self._add_partial(self._table.delete, *args, **kwargs)
+        self._mutation_count += len(data)
+        self._check_batch_size()
+
+    def delete(self, row, columns=None, wal=None):
+        if not isinstance(row, bytes):
+            row = row.encode('utf-8')
+        columns = encode_columns(columns)
+
+        self._mutations.setdefault(row, []).append((None, columns))
+
+        self._mutation_count += len(columns) if columns else 1
+        self._check_batch_size()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self._transaction and exc_type is not None:
+            # Discard the mutations if the block raised an exception
+            self._reset_mutations()
+            return
         self.send()
 
-    def _add_partial(self, func, *args, **kwargs):
-        kwargs['timestamp'] = self._timestamp
-        p = functools.partial(func, *args, **kwargs)
-        self._partials.append(p)
+    def _check_batch_size(self):
+        if (self._batch_size is not None and
+                self._mutation_count >= self._batch_size):
+            self.send()
+
+    def _reset_mutations(self):
+        self._mutations = {}
+        self._mutation_count = 0
@@ -0,0 +1,254 @@
+"""Per-family bloom filters, consulted before reading rows from storage.
+
+Families created with bloom_filter_type ROW keep a filter of the row keys
+that have cells in the family, and ROWCOL a filter of the (row key, column)
+pairs. A point read whose columns are all covered by filters that rule the
+row out doesn't touch the storage. Like in HBase, ROWCOL filters only help
+reads of specific columns.
+
+bloom_filter_vector_size is the size of a filter in bits and
+bloom_filter_nb_hashes the number of hash functions. With a size of 0, a
+filter is sized for the rows of the table, with 10 bits per key, and grows
+with it.
+
+Filters are built from the storage on the first read that needs them, and
+updated by writes. Deletes aren't removed from the filters, they only cause
+false positives until the next compaction rebuilds them.
+"""
+import struct
+import threading
+import zlib
+
+from six import iteritems
+
+# For filters sized automatically
+_BITS_PER_KEY = 10
+_MIN_BITS = 1024
+_DEFAULT_HASHES = 7
+
+
+class BloomFilter(object):
+
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self._vector = bytearray((bits + 7) // 8)
+        # Keys added, counted once each (up to false positives)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing, from two 32-bit hashes of the key
+        h1 = zlib.crc32(key) & 0xffffffff
+        h2 = zlib.adler32(key) | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key):
+        vector = self._vector
+        new = False
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not vector[byte] & (1 << bit):
+                vector[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, key):
+        vector = self._vector
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not vector[byte] & (1 << bit):
+                return False
+        return True
+
+
+class _FamilyFilter(object):
+    # The filter of one family, with its statistics
+
+    def __init__(self, name, options):
+        self.name = name
+        # Encoded family name, followed by a colon
+        self.prefix = (name if isinstance(name, bytes)
+                       else name.encode('utf-8')) + b':'
+        self.type = options['bloom_filter_type'].upper()
+        self.vector_size = options['bloom_filter_vector_size']
+        self.nb_hashes = options['bloom_filter_nb_hashes']
+        self.filter = None
+        self.lookups = 0
+        self.negatives = 0
+        self.false_positives = 0
+
+    def reset(self, keys):
+        # A new empty filter, for about keys keys if sized automatically
+        bits = self.vector_size
+        if not bits:
+            bits = max(_MIN_BITS, keys * _BITS_PER_KEY * 2)
+        self.filter = BloomFilter(bits, self.nb_hashes or _DEFAULT_HASHES)
+
+    def full(self):
+        # An automatically sized filter that holds more keys than it's sized
+        # for, and should be rebuilt bigger
+        return (not self.vector_size and
+                self.filter.count * _BITS_PER_KEY > self.filter.bits)
+
+    def stats(self):
+        # The false positive rate is the share of the rows (or cells) missing
+        # from the storage that the filter didn't rule out
+        missing = self.negatives + self.false_positives
+        return {
+            'type': self.type,
+            'lookups': self.lookups,
+            'negatives': self.negatives,
+            'false_positives': self.false_positives,
+            'false_positive_rate': (self.false_positives / float(missing)
+                                    if missing else 0.0),
+            'keys': self.filter.count if self.filter is not None else 0,
+        }
+
+
+def _rowcol_key(row, colname):
+    return struct.pack('>I', len(row)) + row + colname
+
+
+class BloomFilters(object):
+    """The bloom filters of the families of a table."""
+
+    def __init__(self, families):
+        # Keyed by encoded family name
+        self._families = {}
+        for name, options in iteritems(families):
+            family = _FamilyFilter(name, options)
+            if family.type in ('ROW', 'ROWCOL'):
+                self._families[family.prefix[:-1]] = family
+        self._family_count = len(families)
+        self._built = False
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._families)
+
+    __nonzero__ = __bool__
+
+    def invalidate(self):
+        # Rebuilds the filters from the storage on the next read
+        self._built = False
+
+    def add(self, row, colnames):
+        # Called under the write lock of the table, after a write
+        if not self._built:
+            return
+        families = self._families
+        for colname in colnames:
+            family = families.get(colname.split(b':', 1)[0])
+            if family is None:
+                continue
+            if family.type == 'ROW':
+                family.filter.add(row)
+            else:
+                family.filter.add(_rowcol_key(row, colname))
+            if family.full():
+                self._built = False
+
+    def _build(self, storage):
+        with self._lock:
+            if self._built:
+                return
+            families = list(self._families.values())
+            sizes = dict.fromkeys(families, storage.count())
+            while True:
+                for family in families:
+                    family.reset(sizes[family])
+                self._fill(storage)
+                # ROWCOL filters hold a key per cell, not per row
+                full = [family for family in families if family.full()]
+                if not full:
+                    break
+                for family in full:
+                    sizes[family] = family.filter.count
+            self._built = True
+
+    def _fill(self, storage):
+        families = self._families
+        rowcol = any(f.type == 'ROWCOL' for f in families.values())
+        for row in storage.keys():
+            if not rowcol:
+                # Without reading the rows, every ROW filter gets every row
+                # key, which only adds false positives
+                for family in families.values():
+                    family.filter.add(row)
+                continue
+            for colname in storage.get_row(row) or ():
+                family = families.get(colname.split(b':', 1)[0])
+                if family is None:
+                    continue
+                if family.type == 'ROW':
+                    family.filter.add(row)
+                else:
+                    family.filter.add(_rowcol_key(row, colname))
+
+    def checks(self, projection):
+        # The (family, column) pairs to check for a read, column being None
+        # for a ROW filter, or None if the read isn't covered by filters
+        families = self._families
+        if projection is None:
+            if len(families) < self._family_count:
+                return None
+            names = families.keys()
+            columns = ()
+        else:
+            names = [family if isinstance(family, bytes)
+                     else family.encode('utf-8')
+                     for family in projection.families]
+            columns = projection.columns
+
+        checks = []
+        for name in names:
+            family = families.get(name)
+            if family is None or family.type != 'ROW':
+                return None
+            checks.append((family, None))
+        for colname in columns:
+            family = families.get(colname.split(b':', 1)[0])
+            if family is None:
+                return None
+            checks.append((family,
+                           colname if family.type == 'ROWCOL' else None))
+        return checks
+
+    def might_contain(self, storage, row, checks):
+        # Whether the row may have cells for the checks. Returns the checks
+        # that passed, to be verified with verify() once the row is read.
+        if not self._built:
+            self._build(storage)
+        passed = []
+        with self._lock:
+            for family, colname in checks:
+                family.lookups += 1
+                if colname is None:
+                    key = row
+                else:
+                    key = _rowcol_key(row, colname)
+                if key in family.filter:
+                    passed.append((family, colname))
+                else:
+                    family.negatives += 1
+        return passed
+
+    def verify(self, data, passed):
+        # Counts the checks that passed for a row that turns out not to
+        # have the cells, data being the row as stored
+        data = data or {}
+        for family, colname in passed:
+            if colname is not None:
+                found = colname in data
+            else:
+                prefix = family.prefix
+                found = any(c.startswith(prefix) for c in data)
+            if not found:
+                with self._lock:
+                    family.false_positives += 1
+
+    def stats(self):
+        return {family.name: family.stats()
+                for family in self._families.values()}
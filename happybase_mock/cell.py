@@ -0,0 +1,254 @@
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from six import integer_types
+from six.moves import xrange
+
+try:
+    array('q')
+    _TIMESTAMP_TYPECODE = 'q'
+except ValueError:
+    # Python 2 has no 'q', but 'l' is 64 bits on most platforms
+    _TIMESTAMP_TYPECODE = 'l'
+
+
+def _pack(value):
+    # Counters are stored as integers, and encoded as long integer, big
+    # endian, only when they are read
+    if isinstance(value, integer_types):
+        return struct.pack('>q', value)
+    return value
+
+
+class Cell(object):
+    """All versions of a single cell, kept sorted by descending timestamp.
+
+    Timestamps are stored negated in ascending order, so that bisect can be
+    used directly: the latest version is always at index 0 and the oldest
+    one at the end of the lists. Values are bytes, except for counters
+    which are stored as plain integers.
+    """
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self):
+        self._keys = []
+        self._values = []
+
+    @classmethod
+    def from_versions(cls, timestamps, values):
+        # Builds a cell from versions already sorted by descending timestamp
+        cell = cls()
+        cell._keys = [-ts for ts in timestamps]
+        cell._values = values
+        return cell
+
+    def __len__(self):
+        return len(self._keys)
+
+    def copy(self):
+        cell = Cell()
+        cell._keys = self._keys[:]
+        cell._values = self._values[:]
+        return cell
+
+    def put(self, timestamp, value, max_versions):
+        keys = self._keys
+        key = -timestamp
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            # Same timestamp, overwrite the value
+            self._values[i] = value
+            return
+
+        keys.insert(i, key)
+        self._values.insert(i, value)
+
+        # Evict the oldest version if it exceeds max_versions
+        if len(keys) > max_versions:
+            keys.pop()
+            self._values.pop()
+
+    def latest(self):
+        # Returns (value, timestamp) of the latest version
+        return _pack(self._values[0]), -self._keys[0]
+
+    def get(self, timestamp=None):
+        # Returns (value, timestamp) of the latest version older than
+        # timestamp, or None if there isn't any
+        if timestamp is None:
+            return self.latest()
+        i = bisect_right(self._keys, -timestamp)
+        if i == len(self._keys):
+            return None
+        return _pack(self._values[i]), -self._keys[i]
+
+    def versions(self, timestamp=None):
+        # Yields (value, timestamp) from the latest version to the oldest,
+        # only including versions older than timestamp if it's given
+        keys = self._keys
+        values = self._values
+        start = 0 if timestamp is None else bisect_right(keys, -timestamp)
+        for i in xrange(start, len(keys)):
+            yield _pack(values[i]), -keys[i]
+
+    def trim(self, max_versions):
+        # Deletes the oldest versions beyond max_versions
+        del self._keys[max_versions:]
+        del self._values[max_versions:]
+
+    def delete(self, timestamp):
+        # Deletes all versions with timestamp <= the given one
+        i = bisect_left(self._keys, -timestamp)
+        del self._keys[i:]
+        del self._values[i:]
+
+    def counter(self):
+        # Returns the latest version as a counter value
+        if not self._keys:
+            return 0
+        value = self._values[0]
+        if isinstance(value, integer_types):
+            return value
+        if not value:
+            return 0
+        return struct.unpack('>q', value)[0]
+
+    def set_counter(self, timestamp, value):
+        # Replaces all versions with a single counter value
+        self._keys = [-timestamp]
+        self._values = [value]
+
+
+class CompactCell(Cell):
+    """A Cell that uses less memory, for tables created with compact=True.
+
+    A cell with a single version, which is by far the most common case,
+    stores its negated timestamp and its value directly, without any list.
+    Cells with more versions keep their timestamps in an array of 64-bit
+    integers instead of a list of int objects.
+    """
+    __slots__ = ()
+
+    def __init__(self):
+        # Empty cell
+        self._keys = None
+        self._values = None
+
+    @classmethod
+    def from_versions(cls, timestamps, values):
+        cell = cls()
+        if len(timestamps) == 1:
+            cell._keys = -timestamps[0]
+            cell._values = values[0]
+        elif timestamps:
+            cell._keys = array(_TIMESTAMP_TYPECODE,
+                               [-ts for ts in timestamps])
+            cell._values = values
+        return cell
+
+    def _sequences(self):
+        # Returns the versions as (keys, values) sequences, like in Cell
+        keys = self._keys
+        if keys is None:
+            return (), ()
+        if isinstance(keys, array):
+            return keys, self._values
+        return (keys,), (self._values,)
+
+    def _expand(self):
+        # Switches to the representation used for multiple versions
+        keys, values = self._sequences()
+        self._keys = array(_TIMESTAMP_TYPECODE, keys)
+        self._values = list(values)
+
+    def _shrink(self):
+        # Switches back to the single version (or empty) representation
+        if len(self._keys) == 1:
+            self._keys = self._keys[0]
+            self._values = self._values[0]
+        elif not self._keys:
+            self._keys = None
+            self._values = None
+
+    def __len__(self):
+        keys = self._keys
+        if keys is None:
+            return 0
+        if isinstance(keys, array):
+            return len(keys)
+        return 1
+
+    def copy(self):
+        cell = CompactCell()
+        if isinstance(self._keys, array):
+            cell._keys = array(_TIMESTAMP_TYPECODE, self._keys)
+            cell._values = list(self._values)
+        else:
+            cell._keys = self._keys
+            cell._values = self._values
+        return cell
+
+    def put(self, timestamp, value, max_versions):
+        if self._keys is None:
+            self._keys = -timestamp
+            self._values = value
+            return
+        if self._keys == -timestamp:
+            # Same timestamp as the single version, overwrite the value
+            self._values = value
+            return
+
+        if not isinstance(self._keys, array):
+            self._expand()
+        Cell.put(self, timestamp, value, max_versions)
+        self._shrink()
+
+    def latest(self):
+        keys, values = self._sequences()
+        return _pack(values[0]), -keys[0]
+
+    def get(self, timestamp=None):
+        if timestamp is None:
+            return self.latest()
+        keys, values = self._sequences()
+        i = bisect_right(keys, -timestamp)
+        if i == len(keys):
+            return None
+        return _pack(values[i]), -keys[i]
+
+    def versions(self, timestamp=None):
+        keys, values = self._sequences()
+        start = 0 if timestamp is None else bisect_right(keys, -timestamp)
+        for i in xrange(start, len(keys)):
+            yield _pack(values[i]), -keys[i]
+
+    def trim(self, max_versions):
+        if isinstance(self._keys, array):
+            Cell.trim(self, max_versions)
+            self._shrink()
+        elif max_versions < 1:
+            self._keys = None
+            self._values = None
+
+    def delete(self, timestamp):
+        if self._keys is None:
+            return
+        if not isinstance(self._keys, array):
+            self._expand()
+        Cell.delete(self, timestamp)
+        self._shrink()
+
+    def counter(self):
+        keys, values = self._sequences()
+        if not keys:
+            return 0
+        value = values[0]
+        if isinstance(value, integer_types):
+            return value
+        if not value:
+            return 0
+        return struct.unpack('>q', value)[0]
+
+    def set_counter(self, timestamp, value):
+        self._keys = -timestamp
+        self._values = value
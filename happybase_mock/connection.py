@@ -1,3 +1,6 @@
+import threading
+
+from . import metrics, snapshot
 from .table import Table
 
 
@@ -17,6 +20,7 @@ class _Singleton(type):
     'host:port/table_prefix', value is Connection object
     """
     _instances = {}
+    _instances_lock = threading.RLock()
 
     @classmethod
     def _get_instance_id(cls, host=DEFAULT_HOST, port=DEFAULT_PORT,
@@ -30,10 +34,21 @@ class _Singleton(type):
 
     def __call__(cls, *args, **kwargs):
         instance_id = cls._get_instance_id(**kwargs)
-        if instance_id not in cls._instances:
-            cls._instances[instance_id] = super(_Singleton, cls).__call__(
-                *args, **kwargs)
-        return cls._instances[instance_id]
+        # Threads asking for the same instance must not create two of them
+        with cls._instances_lock:
+            if instance_id not in cls._instances:
+                # Imported here, as it imports this module
+                from . import shared
+                client = shared.client()
+                if client is not None:
+                    # Tables are shared by the processes using this server
+                    instance = shared.RemoteConnection(client, *args,
+                                                       **kwargs)
+                else:
+                    instance = super(_Singleton, cls).__call__(*args,
+                                                               **kwargs)
+                cls._instances[instance_id] = instance
+            return cls._instances[instance_id]
 
 
 class Singleton(_Singleton('SingletonMeta', (object,), {})):
@@ -57,6 +72,12 @@ class Connection(Singleton):
         if not hasattr(self, '_tables'):
             self._tables = {}
 
+        # (stop event, thread) of the background compaction, if it's running
+        self._compaction = None
+
+        # Metrics of the operations, only recorded once enabled
+        self._metrics = None
+
         # TODO: check if connection is opened on some methods
         self._opened = False
         if autoconnect:
@@ -69,11 +90,14 @@ class Connection(Singleton):
         self._opened = False
 
     def __del__(self):
-        # Delete self from Connection._instances
+        # Delete self from Connection._instances, unless it was replaced
+        # already (e.g. by a forked process that forgot its parent's)
         instance_id = Connection._get_instance_id(
             self.host, self.port, self.table_prefix,
             self.table_prefix_separator)
-        Connection._instances.pop(instance_id, None)
+        with Connection._instances_lock:
+            if Connection._instances.get(instance_id) is self:
+                del Connection._instances[instance_id]
 
     def table(self, name, use_prefix=True):
         if use_prefix:
@@ -91,13 +115,18 @@ class Connection(Singleton):
 
         return sorted(names)
 
-    def create_table(self, name, families):
+    @metrics.instrumented()
+    def create_table(self, name, families, compact=False, storage=None):
+        # With compact=True, the table uses a storage layout that needs less
+        # memory per cell, at the cost of slightly slower writes. storage
+        # replaces the default in-memory storage, e.g. with a SqliteStorage.
         name = self._table_name(name)
 
-        table = Table(name, self)
+        table = Table(name, self, compact, storage)
         table._set_families(families)
         self._tables[name] = table
 
+    @metrics.instrumented()
     def delete_table(self, name, disable=False):
         fullname = self._table_name(name)
         table = self._tables.get(fullname)
@@ -111,7 +140,9 @@ class Connection(Singleton):
             raise IOError('TableNotDisabledException: %s' % name)
 
         del self._tables[fullname]
+        table._storage.drop()
 
+    @metrics.instrumented()
     def enable_table(self, name):
         name = self._table_name(name)
         try:
@@ -120,6 +151,7 @@ class Connection(Singleton):
             raise IOError('TableNotFoundException: %s', name)
         table._enabled = True
 
+    @metrics.instrumented()
     def disable_table(self, name):
         name = self._table_name(name)
         try:
@@ -136,8 +168,73 @@ class Connection(Singleton):
             return True
         return table._enabled
 
+    @metrics.instrumented()
     def compact_table(self, name, major=False):
-        pass
+        # Purges expired cells and excess versions. Deletes are applied
+        # immediately in the mock, so there are no delete markers to purge,
+        # and minor and major compactions are the same.
+        table = self._tables.get(self._table_name(name))
+        if table:
+            table._compact()
+
+    def start_compaction(self, interval=60):
+        # Compacts all tables every interval seconds on a background thread
+        self.stop_compaction()
+        stopped = threading.Event()
+
+        def run():
+            while not stopped.wait(interval):
+                for table in list(self._tables.values()):
+                    table._compact()
+
+        thread = threading.Thread(target=run, name='happybase-mock-compaction')
+        thread.daemon = True
+        thread.start()
+        self._compaction = stopped, thread
+
+    def stop_compaction(self):
+        if self._compaction is not None:
+            stopped, thread = self._compaction
+            stopped.set()
+            thread.join()
+            self._compaction = None
+
+    def checkpoint(self):
+        # Returns the current state of all the tables, to be restored later
+        # with restore(), see Table.checkpoint()
+        return {
+            name: (table, table._enabled, table.checkpoint())
+            for name, table in self._tables.items()
+        }
+
+    def restore(self, checkpoint):
+        # Puts back the tables of a checkpoint in their state back then, and
+        # deletes the tables created since
+        tables = {}
+        for name, (table, enabled, table_checkpoint) in checkpoint.items():
+            table.restore(table_checkpoint)
+            table._enabled = enabled
+            tables[name] = table
+        self._tables = tables
+
+    def enable_metrics(self, tracer=None):
+        # Starts recording metrics of the operations on this connection and
+        # its tables. tracer is called with a metrics.Event after every
+        # operation.
+        self._metrics = metrics.Metrics(tracer)
+        return self._metrics
+
+    def disable_metrics(self):
+        self._metrics = None
+
+    def save(self, path):
+        # Saves all tables with their data to a snapshot file
+        snapshot.dump(self, path)
+
+    def load(self, path):
+        # Loads the tables of a snapshot file, replacing existing tables
+        # with the same names
+        snapshot.load(self, path)
 
     def _table_name(self, name):
         if self.table_prefix is None:
@@ -0,0 +1,546 @@
+"""A subset of the HBase filter language, for Table.scan(filter=...).
+
+A filter string is parsed once into a tree of filter objects, which is
+cached by string. Every scan gets its own copy of the stateful filters in
+that tree (e.g. PageFilter) through compile_filter().
+
+Filters see a row as its key and a list of (column, value, timestamp)
+tuples sorted by column, and work in three steps:
+
+* row_key(key) decides on the row key alone, before the row is read
+* accept_row(key, cells) decides on the whole row, e.g. on a column value
+* select(key, cells) picks (and possibly transforms) the returned cells
+
+A filter sets its ``done`` attribute when the scan can stop, e.g. once a
+PageFilter has seen enough rows.
+"""
+import operator
+import re
+import struct
+import threading
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+        | (?P<op><=|>=|!=|=|<|>)
+        | (?P<punct>[(),])
+        | (?P<number>-?\d+)
+        | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )""", re.VERBOSE)
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def compile_filter(filter_string, reverse=False):
+    """Returns a new filter for a scan, parsing filter_string if needed.
+
+    reverse tells the filters that the scan goes down the row keys.
+    """
+    if isinstance(filter_string, bytes):
+        filter_string = filter_string.decode('utf-8')
+
+    prototype = _cache.get(filter_string)
+    if prototype is None:
+        prototype = _Parser(filter_string).parse()
+        with _cache_lock:
+            if len(_cache) >= _CACHE_SIZE:
+                _cache.clear()
+            _cache[filter_string] = prototype
+    return prototype.new(reverse)
+
+
+def _error(message, *args):
+    return IOError('IllegalArgumentException: ' + message % args)
+
+
+class _Parser(object):
+
+    def __init__(self, string):
+        self.string = string
+        self.tokens = self._tokenize(string)
+        self.pos = 0
+
+    def _tokenize(self, string):
+        tokens = []
+        pos = 0
+        string = string.rstrip()
+        while pos < len(string):
+            match = _TOKEN_RE.match(string, pos)
+            if match is None:
+                raise _error('Invalid filter string at %d: %s', pos, string)
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'string':
+                value = value[1:-1].replace("''", "'").encode('utf-8')
+            elif kind == 'number':
+                value = int(value)
+            tokens.append((kind, value))
+            pos = match.end()
+        return tokens
+
+    def parse(self):
+        node = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise _error('Unexpected %r in filter string: %s',
+                         self.tokens[self.pos][1], self.string)
+        return node
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise _error('Unexpected end of filter string: %s', self.string)
+        self.pos += 1
+        return token
+
+    def _expect(self, value):
+        token = self._next()
+        if token != ('punct', value):
+            raise _error('Expected %r in filter string: %s', value,
+                         self.string)
+
+    def _parse_or(self):
+        nodes = [self._parse_and()]
+        while self._peek() == ('word', 'OR'):
+            self.pos += 1
+            nodes.append(self._parse_and())
+        return nodes[0] if len(nodes) == 1 else _Or(nodes)
+
+    def _parse_and(self):
+        nodes = [self._parse_unary()]
+        while self._peek() == ('word', 'AND'):
+            self.pos += 1
+            nodes.append(self._parse_unary())
+        return nodes[0] if len(nodes) == 1 else _And(nodes)
+
+    def _parse_unary(self):
+        kind, value = self._next()
+        if (kind, value) == ('word', 'SKIP'):
+            return _Skip(self._parse_unary())
+        if (kind, value) == ('word', 'WHILE'):
+            return _While(self._parse_unary())
+        if (kind, value) == ('punct', '('):
+            node = self._parse_or()
+            self._expect(')')
+            return node
+        if kind != 'word':
+            raise _error('Expected a filter name, got %r: %s', value,
+                         self.string)
+        return self._parse_filter(value)
+
+    def _parse_filter(self, name):
+        cls = _FILTERS.get(name)
+        if cls is None:
+            raise _error('Unsupported filter %s', name)
+
+        self._expect('(')
+        args = []
+        if self._peek() != ('punct', ')'):
+            while True:
+                kind, value = self._next()
+                if kind == 'word' and value in ('true', 'false'):
+                    value = value == 'true'
+                elif kind not in ('string', 'number', 'op'):
+                    raise _error('Invalid argument %r for %s', value, name)
+                args.append(value)
+                if self._peek() != ('punct', ','):
+                    break
+                self.pos += 1
+        self._expect(')')
+
+        try:
+            return cls(*args)
+        except TypeError:
+            raise _error('Invalid arguments for %s: %r', name, args)
+
+
+def _comparison(op, comparator):
+    # Compiles "value <op> comparator" into a predicate on a value
+    compare = _OPERATORS.get(op)
+    if compare is None or not isinstance(comparator, bytes):
+        raise TypeError()
+
+    kind, _, operand = comparator.partition(b':')
+    if kind == b'binary':
+        return lambda value: compare(value, operand)
+    if kind == b'binaryprefix':
+        length = len(operand)
+        return lambda value: compare(value[:length], operand)
+
+    if op not in ('=', '!='):
+        raise TypeError()
+    if kind == b'regexstring':
+        search = re.compile(operand).search
+
+        def found(value):
+            return search(value) is not None
+    elif kind == b'substring':
+        # Like HBase's SubstringComparator, this is case-insensitive
+        operand = operand.lower()
+
+        def found(value):
+            return operand in value.lower()
+    else:
+        raise TypeError()
+
+    if op == '=':
+        return found
+    return lambda value: not found(value)
+
+
+def _qualifier(column):
+    return column.partition(b':')[2]
+
+
+def _family(column):
+    return column.partition(b':')[0]
+
+
+class _Filter(object):
+    done = False
+    prefix = None
+
+    def new(self, reverse=False):
+        # Stateless filters can be shared by every scan
+        return self
+
+    def row_key(self, key):
+        return True
+
+    def accept_row(self, key, cells):
+        return True
+
+    def select(self, key, cells):
+        return cells
+
+    def row_returned(self):
+        pass
+
+
+class _And(_Filter):
+
+    def __init__(self, filters):
+        self.filters = filters
+        # A row must have the prefix of any PrefixFilter in the list, which
+        # allows the scan to narrow its range
+        for f in filters:
+            if f.prefix is not None:
+                self.prefix = f.prefix
+                break
+
+    def new(self, reverse=False):
+        return _And([f.new(reverse) for f in self.filters])
+
+    @property
+    def done(self):
+        return any(f.done for f in self.filters)
+
+    def row_key(self, key):
+        return all(f.row_key(key) for f in self.filters)
+
+    def accept_row(self, key, cells):
+        return all(f.accept_row(key, cells) for f in self.filters)
+
+    def select(self, key, cells):
+        for f in self.filters:
+            cells = f.select(key, cells)
+        return cells
+
+    def row_returned(self):
+        for f in self.filters:
+            f.row_returned()
+
+
+class _Or(_Filter):
+
+    def __init__(self, filters):
+        self.filters = filters
+
+    def new(self, reverse=False):
+        return _Or([f.new(reverse) for f in self.filters])
+
+    @property
+    def done(self):
+        return all(f.done for f in self.filters)
+
+    def row_key(self, key):
+        return any(f.row_key(key) for f in self.filters)
+
+    def accept_row(self, key, cells):
+        return any(f.row_key(key) and f.accept_row(key, cells)
+                   for f in self.filters)
+
+    def select(self, key, cells):
+        # Union of the cells selected by the filters that accept the row
+        selected = {}
+        for f in self.filters:
+            if f.row_key(key) and f.accept_row(key, cells):
+                for cell in f.select(key, cells):
+                    selected.setdefault(cell[0], cell)
+        return sorted(selected.values())
+
+    def row_returned(self):
+        for f in self.filters:
+            f.row_returned()
+
+
+class _Skip(_Filter):
+    # Skips the whole row if the filter would drop any of its cells
+
+    def __init__(self, filter):
+        self.filter = filter
+
+    def new(self, reverse=False):
+        return self.__class__(self.filter.new(reverse))
+
+    def row_key(self, key):
+        return self.filter.row_key(key)
+
+    def accept_row(self, key, cells):
+        return (self.filter.accept_row(key, cells) and
+                len(self.filter.select(key, cells)) == len(cells))
+
+    def select(self, key, cells):
+        return self.filter.select(key, cells)
+
+    def row_returned(self):
+        self.filter.row_returned()
+
+
+class _While(_Skip):
+    # Like SKIP, but ends the scan at the first row that is skipped
+
+    def __init__(self, filter):
+        super(_While, self).__init__(filter)
+        self.done = False
+
+    def row_key(self, key):
+        if not self.filter.row_key(key):
+            self.done = True
+        return not self.done
+
+    def accept_row(self, key, cells):
+        if not super(_While, self).accept_row(key, cells):
+            self.done = True
+        return not self.done
+
+
+class KeyOnlyFilter(_Filter):
+
+    def __init__(self, len_as_value=False):
+        self.len_as_value = len_as_value
+
+    def select(self, key, cells):
+        if self.len_as_value:
+            return [(c, struct.pack('>i', len(v)), ts) for c, v, ts in cells]
+        return [(c, b'', ts) for c, _, ts in cells]
+
+
+class FirstKeyOnlyFilter(_Filter):
+
+    def select(self, key, cells):
+        return cells[:1]
+
+
+class ColumnCountGetFilter(_Filter):
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def select(self, key, cells):
+        return cells[:self.limit]
+
+
+class ColumnPaginationFilter(_Filter):
+
+    def __init__(self, limit, offset):
+        self.limit = limit
+        self.offset = offset
+
+    def select(self, key, cells):
+        return cells[self.offset:self.offset + self.limit]
+
+
+class PrefixFilter(_Filter):
+
+    def __init__(self, prefix):
+        if not isinstance(prefix, bytes):
+            raise TypeError()
+        self.prefix = prefix
+
+    def row_key(self, key):
+        return key.startswith(self.prefix)
+
+
+class InclusiveStopFilter(_Filter):
+
+    def __init__(self, stop_row, reverse=False):
+        if not isinstance(stop_row, bytes):
+            raise TypeError()
+        self.stop_row = stop_row
+        self.reverse = reverse
+        self.done = False
+
+    def new(self, reverse=False):
+        return InclusiveStopFilter(self.stop_row, reverse)
+
+    def row_key(self, key):
+        # A reverse scan ends below the stop row
+        if self.reverse:
+            past = key < self.stop_row
+        else:
+            past = key > self.stop_row
+        if past:
+            self.done = True
+        return not self.done
+
+
+class PageFilter(_Filter):
+
+    def __init__(self, page_size):
+        if not isinstance(page_size, int) or isinstance(page_size, bool):
+            raise TypeError()
+        self.page_size = page_size
+        self.rows = 0
+
+    def new(self, reverse=False):
+        return PageFilter(self.page_size)
+
+    @property
+    def done(self):
+        return self.rows >= self.page_size
+
+    def accept_row(self, key, cells):
+        return not self.done
+
+    def row_returned(self):
+        self.rows += 1
+
+
+class ColumnPrefixFilter(_Filter):
+
+    def __init__(self, *prefixes):
+        if not prefixes or not all(isinstance(p, bytes) for p in prefixes):
+            raise TypeError()
+        self.prefixes = tuple(prefixes)
+
+    def select(self, key, cells):
+        return [cell for cell in cells
+                if _qualifier(cell[0]).startswith(self.prefixes)]
+
+
+class MultipleColumnPrefixFilter(ColumnPrefixFilter):
+    pass
+
+
+class ColumnRangeFilter(_Filter):
+
+    def __init__(self, min_column, min_inclusive, max_column, max_inclusive):
+        self.min_column = min_column or None
+        self.min_inclusive = min_inclusive
+        self.max_column = max_column or None
+        self.max_inclusive = max_inclusive
+
+    def _in_range(self, qualifier):
+        if self.min_column is not None:
+            if qualifier < self.min_column or (
+                    qualifier == self.min_column and not self.min_inclusive):
+                return False
+        if self.max_column is not None:
+            if qualifier > self.max_column or (
+                    qualifier == self.max_column and not self.max_inclusive):
+                return False
+        return True
+
+    def select(self, key, cells):
+        return [cell for cell in cells if self._in_range(_qualifier(cell[0]))]
+
+
+class RowFilter(_Filter):
+
+    def __init__(self, op, comparator):
+        self.match = _comparison(op, comparator)
+
+    def row_key(self, key):
+        return self.match(key)
+
+
+class FamilyFilter(RowFilter):
+
+    def row_key(self, key):
+        return True
+
+    def select(self, key, cells):
+        return [cell for cell in cells if self.match(_family(cell[0]))]
+
+
+class QualifierFilter(FamilyFilter):
+
+    def select(self, key, cells):
+        return [cell for cell in cells if self.match(_qualifier(cell[0]))]
+
+
+class ValueFilter(FamilyFilter):
+
+    def select(self, key, cells):
+        return [cell for cell in cells if self.match(cell[1])]
+
+
+class SingleColumnValueFilter(_Filter):
+
+    def __init__(self, family, qualifier, op, comparator,
+                 filter_if_missing=False, latest_version_only=True):
+        if not isinstance(family, bytes) or not isinstance(qualifier, bytes):
+            raise TypeError()
+        self.column = family + b':' + qualifier
+        self.match = _comparison(op, comparator)
+        self.filter_if_missing = filter_if_missing
+
+    def accept_row(self, key, cells):
+        for column, value, _ in cells:
+            if column == self.column:
+                return self.match(value)
+        return not self.filter_if_missing
+
+
+class SingleColumnValueExcludeFilter(SingleColumnValueFilter):
+
+    def select(self, key, cells):
+        return [cell for cell in cells if cell[0] != self.column]
+
+
+_FILTERS = {
+    cls.__name__: cls for cls in (
+        KeyOnlyFilter,
+        FirstKeyOnlyFilter,
+        ColumnCountGetFilter,
+        ColumnPaginationFilter,
+        PrefixFilter,
+        InclusiveStopFilter,
+        PageFilter,
+        ColumnPrefixFilter,
+        MultipleColumnPrefixFilter,
+        ColumnRangeFilter,
+        RowFilter,
+        FamilyFilter,
+        QualifierFilter,
+        ValueFilter,
+        SingleColumnValueFilter,
+        SingleColumnValueExcludeFilter,
+    )
+}
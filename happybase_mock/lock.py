@@ -0,0 +1,69 @@
+import threading
+from six.moves import _thread
+
+
+class ReadWriteLock(object):
+    """A lock that allows either many readers or a single writer.
+
+    Use ``with lock.read:`` and ``with lock.write:``. The write lock is
+    reentrant, and a thread that holds it may also take the read lock. A
+    thread holding only the read lock must not try to take the write lock.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self.read = _LockContext(self.acquire_read, self.release_read)
+        self.write = _LockContext(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        me = _thread.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            while self._writer is not None:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            if self._writer == _thread.get_ident():
+                self._writer_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = _thread.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class _LockContext(object):
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._release()
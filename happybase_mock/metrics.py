@@ -0,0 +1,229 @@
+"""Opt-in metrics of the operations made on a Connection and its tables.
+
+Enabled with ``Connection.enable_metrics()``. Every public call counts as an
+operation, and calls made from within another operation (e.g. ``rows()``
+calling ``row()``) are part of the outer one. A scan is an operation that
+lasts until the scanner is exhausted or closed.
+"""
+import functools
+import threading
+from collections import namedtuple
+from timeit import default_timer
+
+from six import iteritems, itervalues
+
+# Passed to the tracer of a Metrics after every operation. table is None for
+# operations on the Connection, error is the exception the operation raised.
+Event = namedtuple('Event', 'table method elapsed cells_read cells_written '
+                            'bytes_read bytes_written error')
+
+_COUNTERS = ('calls', 'errors', 'time', 'cells_read', 'cells_written',
+             'bytes_read', 'bytes_written')
+
+
+class Metrics(object):
+
+    def __init__(self, tracer=None):
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        # key: (table name, method), value: list of counters, in the order
+        # of _COUNTERS
+        self._counters = {}
+
+    def stats(self, table=None):
+        # Counters of every method, summed over all the tables, or only for
+        # the given table (its full name, including the table prefix)
+        result = {}
+        with self._lock:
+            for (name, method), counters in iteritems(self._counters):
+                if table is not None and name != table:
+                    continue
+                totals = result.setdefault(method, [0] * len(_COUNTERS))
+                for i, value in enumerate(counters):
+                    totals[i] += value
+        return {method: dict(zip(_COUNTERS, totals))
+                for method, totals in iteritems(result)}
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+    def record(self, event):
+        with self._lock:
+            counters = self._counters.get((event.table, event.method))
+            if counters is None:
+                counters = [0] * len(_COUNTERS)
+                self._counters[event.table, event.method] = counters
+            counters[0] += 1
+            counters[1] += event.error is not None
+            counters[2] += event.elapsed
+            counters[3] += event.cells_read
+            counters[4] += event.cells_written
+            counters[5] += event.bytes_read
+            counters[6] += event.bytes_written
+        if self.tracer is not None:
+            self.tracer(event)
+
+
+def instrumented(volume=None, name=None):
+    """Decorates a Table or Connection method to record its calls.
+
+    volume(args, kwargs, result) returns the (cells_read, cells_written,
+    bytes_read, bytes_written) of a call.
+    """
+    def decorator(method):
+        method_name = name or method.__name__
+
+        @functools.wraps(method)
+        def wrap(self, *args, **kwargs):
+            connection = getattr(self, 'connection', self)
+            metrics = connection._metrics
+            if metrics is None or getattr(metrics._local, 'active', False):
+                return method(self, *args, **kwargs)
+
+            table = self.name if connection is not self else None
+            metrics._local.active = True
+            start = default_timer()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                metrics.record(Event(table, method_name,
+                                     default_timer() - start, 0, 0, 0, 0, e))
+                raise
+            finally:
+                metrics._local.active = False
+            elapsed = default_timer() - start
+
+            if method_name == 'scan':
+                return _traced_scan(metrics, table, result, elapsed)
+
+            if volume is None:
+                counts = (0, 0, 0, 0)
+            else:
+                counts = volume(args, kwargs, result)
+            metrics.record(Event(table, method_name, elapsed, *counts,
+                                 error=None))
+            return result
+        return wrap
+    return decorator
+
+
+def _traced_scan(metrics, table, scanner, elapsed):
+    scanner._trace = _ScanTrace(metrics, table, elapsed)
+    return scanner
+
+
+class _ScanTrace(object):
+    # Records a scan once it's exhausted or closed, with the time spent
+    # producing the rows
+
+    def __init__(self, metrics, table, elapsed):
+        self.metrics = metrics
+        self.table = table
+        self.elapsed = elapsed
+        self.cells = self.size = 0
+        self.recorded = False
+
+    def __call__(self, next_row):
+        start = default_timer()
+        try:
+            row = next_row()
+        except StopIteration:
+            self.elapsed += default_timer() - start
+            self.finish()
+            raise
+        except Exception as e:
+            self.elapsed += default_timer() - start
+            self.finish(e)
+            raise
+        self.elapsed += default_timer() - start
+        n, b = _data_volume(row[1])
+        self.cells += n
+        self.size += len(row[0]) + b
+        return row
+
+    def finish(self, error=None):
+        if not self.recorded:
+            self.recorded = True
+            self.metrics.record(Event(self.table, 'scan', self.elapsed,
+                                      self.cells, 0, self.size, 0, error))
+
+
+def _arg(args, kwargs, index, name, default=None):
+    if len(args) > index:
+        return args[index]
+    return kwargs.get(name, default)
+
+
+def _data_volume(data):
+    # Number of cells and bytes of a row dict, as passed to put() or
+    # returned by row(), where values may be (value, timestamp) tuples
+    size = 0
+    for colname, value in iteritems(data):
+        if isinstance(value, tuple):
+            value = value[0]
+        size += len(colname) + len(value)
+    return len(data), size
+
+
+def row_volume(args, kwargs, result):
+    cells, size = _data_volume(result)
+    return cells, 0, size, 0
+
+
+def rows_volume(args, kwargs, result):
+    if isinstance(result, dict):
+        result = iteritems(result)
+    cells = size = 0
+    for _, data in result:
+        n, b = _data_volume(data)
+        cells += n
+        size += b
+    return cells, 0, size, 0
+
+
+def cells_volume(args, kwargs, result):
+    size = 0
+    for value in result:
+        if isinstance(value, tuple):
+            value = value[0]
+        size += len(value)
+    return len(result), 0, size, 0
+
+
+def put_volume(args, kwargs, result):
+    cells, size = _data_volume(_arg(args, kwargs, 1, 'data'))
+    return 0, cells, 0, size
+
+
+def delete_volume(args, kwargs, result):
+    columns = _arg(args, kwargs, 1, 'columns')
+    return 0, len(columns) if columns else 0, 0, 0
+
+
+def counter_read_volume(args, kwargs, result):
+    return 1, 0, 8, 0
+
+
+def counter_write_volume(args, kwargs, result):
+    return 0, 1, 0, 8
+
+
+def counter_update_volume(args, kwargs, result):
+    return 1, 1, 8, 8
+
+
+def batch_volume(args, kwargs, result):
+    # Mutations of Table._apply()
+    cells = size = 0
+    for ops in itervalues(args[0]):
+        for data, columns in ops:
+            if data is not None:
+                n, b = _data_volume(data)
+                cells += n
+                size += b
+            elif columns:
+                cells += len(columns)
+    return 0, cells, 0, size
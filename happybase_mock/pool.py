@@ -1,14 +1,94 @@
 import contextlib
+import threading
+import time
+from six.moves import queue, xrange
 
 from .connection import Connection
 
 
+class NoConnectionsAvailable(RuntimeError):
+    pass
+
+
 class ConnectionPool(object):
 
     def __init__(self, size, **kwargs):
-        self._conn = Connection(**kwargs)
+        if not isinstance(size, int):
+            raise TypeError("Pool 'size' arg must be an integer")
+
+        if not size > 0:
+            raise ValueError("Pool 'size' arg must be greater than zero")
+
+        self._size = size
+        self._lock = threading.Lock()
+        self._queue = queue.LifoQueue(maxsize=size)
+        self._thread_connections = threading.local()
+
+        # Connections with the same arguments are the same singleton, so all
+        # the handles in the queue share the same tables. The queue only
+        # bounds how many of them can be checked out at the same time.
+        for _ in xrange(size):
+            self._queue.put(Connection(**kwargs))
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self._size,
+                'available': self._queue.qsize(),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'timeouts': self._timeouts,
+            }
+
+    def _acquire_connection(self, timeout=None):
+        try:
+            connection = self._queue.get(False)
+        except queue.Empty:
+            # Pool is exhausted, wait for a connection to be returned
+            start = time.time()
+            try:
+                connection = self._queue.get(True, timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._waits += 1
+                    self._wait_time += time.time() - start
+                    self._timeouts += 1
+                raise NoConnectionsAvailable(
+                    "No connection available from pool within specified "
+                    "timeout")
+            with self._lock:
+                self._waits += 1
+                self._wait_time += time.time() - start
+
+        with self._lock:
+            self._checkouts += 1
+        return connection
+
+    def _return_connection(self, connection):
+        self._queue.put(connection)
 
     @contextlib.contextmanager
     def connection(self, timeout=None):
-        self._conn.open()
-        yield self._conn
+        # Nested requests from the same thread get the same connection
+        connection = getattr(self._thread_connections, 'current', None)
+
+        return_after_use = False
+        if connection is None:
+            return_after_use = True
+            connection = self._acquire_connection(timeout)
+            with self._lock:
+                self._thread_connections.current = connection
+
+        try:
+            connection.open()
+            yield connection
+        finally:
+            if return_after_use:
+                del self._thread_connections.current
+                self._return_connection(connection)
@@ -0,0 +1,182 @@
+from collections import deque
+
+from six import iteritems
+
+
+class Scanner(object):
+    """The rows of a Table.scan(), read batch_size rows at a time.
+
+    With scan_batching, a row with more columns than that is returned in
+    parts of at most scan_batching columns, in column order. last_row is the
+    key of the last row (or part of a row) returned, and last_column the last
+    column returned if the row isn't complete yet. resume() picks the scan up
+    from there, e.g. after the scanner was closed.
+    """
+
+    def __init__(self, table, storage, row_start, row_stop, projection,
+                 filter, timestamp, include_timestamp, batch_size,
+                 scan_batching=None, limit=None, reverse=False, skip=None):
+        self.table = table
+        self._storage = storage
+        self._range = row_start, row_stop
+        self._projection = projection
+        self._filter = filter
+        self._timestamp = timestamp
+        self._include_timestamp = include_timestamp
+        self._batch_size = batch_size
+        self._scan_batching = scan_batching
+        self._limit = limit
+        self._reverse = reverse
+
+        # The range left to read, and the rows read but not returned yet
+        self._row_start = row_start
+        self._row_stop = row_stop
+        self._buffer = deque()
+        self._exhausted = False
+
+        # (row, sorted columns, index of the next one) of a partly returned
+        # row, and (row, column) of a row to return after column only
+        self._partial = None
+        self._skip = skip
+
+        self.last_row = None
+        self.last_column = None
+        self._returned = 0
+
+        # Set by metrics, to record the scan
+        self._trace = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._trace is not None:
+            return self._trace(self._next)
+        return self._next()
+
+    next = __next__
+
+    def close(self):
+        self._release()
+        if self._trace is not None:
+            self._trace.finish()
+
+    def _release(self):
+        # Stops the scan and releases the rows it holds on to
+        self._exhausted = True
+        self._buffer.clear()
+        self._partial = None
+        self._storage = None
+
+    def resume(self):
+        """Returns a new scanner over the rest of this scan.
+
+        The rest is read from the table as it is now, while this scanner
+        keeps reading the rows as they were when the scan started.
+        """
+        row_start, row_stop = self._range
+        skip = None
+        if self.last_row is not None:
+            if self.last_column is not None:
+                # Read the last row again, from the column after the last one
+                skip = self.last_row, self.last_column
+            if self._reverse:
+                row_stop = self.last_row + b'\x00' if skip else self.last_row
+            else:
+                row_start = self.last_row if skip else self.last_row + b'\x00'
+
+        limit = self._limit
+        if limit is not None:
+            limit -= self._returned
+        return self.table._scanner(
+            row_start, row_stop, self._projection, self._filter,
+            self._timestamp, self._include_timestamp, self._batch_size,
+            self._scan_batching, limit, self._reverse, skip)
+
+    def _next(self):
+        limit = self._limit
+        if limit is not None and self._returned >= limit:
+            self._release()
+            raise StopIteration
+
+        if self._partial is None:
+            data = None
+            while not data:
+                if not self._buffer:
+                    self._fetch()
+                    if not self._buffer:
+                        self._release()
+                        raise StopIteration
+                row, data = self._buffer.popleft()
+                if self._skip is not None and self._skip[0] == row:
+                    column = self._skip[1]
+                    data = {colname: value
+                            for colname, value in iteritems(data)
+                            if colname > column}
+                    self._skip = None
+
+            scan_batching = self._scan_batching
+            if scan_batching is None or len(data) <= scan_batching:
+                self.last_row = row
+                self.last_column = None
+                self._returned += 1
+                return row, data
+            self._partial = row, sorted(iteritems(data)), 0
+
+        # The next part of a wide row
+        row, columns, index = self._partial
+        end = index + self._scan_batching
+        part = columns[index:end]
+        if end < len(columns):
+            self._partial = row, columns, end
+            self.last_column = part[-1][0]
+        else:
+            self._partial = None
+            self.last_column = None
+        self.last_row = row
+        self._returned += 1
+        return row, dict(part)
+
+    def _fetch(self):
+        # Reads the next batch of rows that have matching cells into the
+        # buffer, resuming right after the last key of the previous batch.
+        # The lock is only held while a batch is read, so that the consumer
+        # can write to the table in between.
+        table = self.table
+        storage = self._storage
+        filter = self._filter
+        while not self._buffer and not self._exhausted:
+            how_many = self._batch_size
+            if self._limit is not None:
+                how_many = min(how_many, self._limit - self._returned)
+
+            with table._lock.read:
+                rows = storage.key_range(self._row_start, self._row_stop,
+                                         how_many, self._reverse)
+                if not rows:
+                    self._exhausted = True
+                    return
+
+                # Like HBase, skip rows without any matching cells
+                oldest = table._oldest_timestamps()
+                for row in rows:
+                    if filter is None:
+                        data = table._row(
+                            storage.get_row(row), self._projection,
+                            self._timestamp, self._include_timestamp, oldest)
+                    else:
+                        data = table._filtered_row(
+                            storage, row, self._projection, filter,
+                            self._timestamp, self._include_timestamp, oldest)
+                    if data:
+                        self._buffer.append((row, data))
+                        if filter is not None:
+                            filter.row_returned()
+                    if filter is not None and filter.done:
+                        self._exhausted = True
+                        break
+
+            if self._reverse:
+                self._row_stop = rows[-1]
+            else:
+                self._row_start = rows[-1] + b'\x00'
@@ -0,0 +1,459 @@
+"""HBase Thrift1 server backed by the in-memory tables.
+
+Clients of the HBase Thrift1 API, e.g. the real happybase, can connect to it
+like to an HBase Thrift server. It needs thriftpy2, install it with
+``pip install happybase-mock[server]``. Run it with::
+
+    python -m happybase_mock.server --port 9090
+
+or start it from Python with ``ThriftServer(port=9090).start()``. Each client
+connection is served by its own thread.
+"""
+import argparse
+import functools
+import itertools
+import os
+import socket
+import threading
+from itertools import islice
+
+from six import iteritems
+
+from .connection import DEFAULT_HOST, DEFAULT_PORT, Connection
+
+try:
+    import thriftpy2
+    from thriftpy2.protocol import (
+        TBinaryProtocolFactory, TCompactProtocolFactory)
+    from thriftpy2.server import TThreadedServer
+    from thriftpy2.thrift import TApplicationException, TProcessor
+    from thriftpy2.transport import (
+        TBufferedTransportFactory, TFramedTransportFactory, TServerSocket)
+except ImportError:  # pragma: no cover
+    thriftpy2 = None
+
+if thriftpy2 is not None:
+    hbase = thriftpy2.load(
+        os.path.join(os.path.dirname(__file__), 'Hbase.thrift'),
+        module_name='happybase_mock_thrift')
+
+    TRANSPORTS = {
+        'buffered': TBufferedTransportFactory,
+        'framed': TFramedTransportFactory,
+    }
+    PROTOCOLS = {
+        'binary': TBinaryProtocolFactory,
+        'compact': TCompactProtocolFactory,
+    }
+
+# Mapping of ColumnDescriptor fields to family options
+_DESCRIPTOR_OPTIONS = {
+    'maxVersions': 'max_versions',
+    'compression': 'compression',
+    'inMemory': 'in_memory',
+    'bloomFilterType': 'bloom_filter_type',
+    'bloomFilterVectorSize': 'bloom_filter_vector_size',
+    'bloomFilterNbHashes': 'bloom_filter_nb_hashes',
+    'blockCacheEnabled': 'block_cache_enabled',
+    'timeToLive': 'time_to_live',
+}
+
+
+def _io_errors(method):
+    # Errors of the tables are sent to the client as Thrift IOErrors
+    @functools.wraps(method)
+    def wrap(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except (IOError, TypeError, ValueError) as e:
+            raise hbase.IOError(message=str(e))
+    return wrap
+
+
+def _name(name):
+    # Table names are sent as bytes, but tables are keyed by str
+    if isinstance(name, bytes):
+        return name.decode('utf-8')
+    return name
+
+
+class Handler(object):
+    """Implements the Hbase service over a Connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._scanners = {}
+        self._scanner_ids = itertools.count(1)
+        self._scanners_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Calls the mock can't answer fail without dropping the client
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def unsupported(*args):
+            raise TApplicationException(
+                TApplicationException.UNKNOWN_METHOD,
+                '%s is not supported by happybase-mock' % name)
+        return unsupported
+
+    def _table(self, name):
+        return self.connection.table(_name(name), use_prefix=False)
+
+    # Tables
+
+    @_io_errors
+    def getTableNames(self):
+        return [name.encode('utf-8') for name in self.connection.tables()]
+
+    @_io_errors
+    def enableTable(self, tableName):
+        self.connection.enable_table(_name(tableName))
+
+    @_io_errors
+    def disableTable(self, tableName):
+        self.connection.disable_table(_name(tableName))
+
+    @_io_errors
+    def isTableEnabled(self, tableName):
+        return self.connection.is_table_enabled(_name(tableName))
+
+    @_io_errors
+    def compact(self, tableNameOrRegionName):
+        self.connection.compact_table(_name(tableNameOrRegionName))
+
+    @_io_errors
+    def majorCompact(self, tableNameOrRegionName):
+        self.connection.compact_table(_name(tableNameOrRegionName), True)
+
+    @_io_errors
+    def getColumnDescriptors(self, tableName):
+        descriptors = {}
+        for name, options in iteritems(self._table(tableName).families()):
+            name = _name(name).encode('utf-8') + b':'
+            descriptors[name] = hbase.ColumnDescriptor(name=name, **{
+                field: options[option]
+                for field, option in iteritems(_DESCRIPTOR_OPTIONS)})
+        return descriptors
+
+    @_io_errors
+    def getTableRegions(self, tableName):
+        return [hbase.TRegionInfo(
+            startKey=region['start_key'].encode('utf-8'),
+            endKey=region['end_key'].encode('utf-8'),
+            id=region['id'],
+            name=region['name'].encode('utf-8'),
+            version=region['version'],
+            serverName=region['server_name'].encode('utf-8'),
+            port=region['port'],
+        ) for region in self._table(tableName).regions()]
+
+    @_io_errors
+    def createTable(self, tableName, columnFamilies):
+        name = _name(tableName)
+        if name in self.connection.tables():
+            raise hbase.AlreadyExists(message='table %s exists' % name)
+
+        families = {}
+        for descriptor in columnFamilies:
+            families[_name(descriptor.name).rstrip(':')] = {
+                option: getattr(descriptor, field)
+                for field, option in iteritems(_DESCRIPTOR_OPTIONS)}
+        self.connection.create_table(name, families)
+
+    @_io_errors
+    def deleteTable(self, tableName):
+        self.connection.delete_table(_name(tableName))
+
+    # Reads
+
+    @_io_errors
+    def get(self, tableName, row, column, attributes):
+        return self.getVer(tableName, row, column, 1, attributes)
+
+    @_io_errors
+    def getVer(self, tableName, row, column, numVersions, attributes):
+        return self.getVerTs(tableName, row, column, None, numVersions,
+                             attributes)
+
+    @_io_errors
+    def getVerTs(self, tableName, row, column, timestamp, numVersions,
+                 attributes):
+        cells = self._table(tableName).cells(
+            row, column, numVersions, timestamp, include_timestamp=True)
+        return [hbase.TCell(value=value, timestamp=ts)
+                for value, ts in cells]
+
+    @_io_errors
+    def getRow(self, tableName, row, attributes):
+        return self.getRowWithColumnsTs(tableName, row, None, None,
+                                        attributes)
+
+    @_io_errors
+    def getRowWithColumns(self, tableName, row, columns, attributes):
+        return self.getRowWithColumnsTs(tableName, row, columns, None,
+                                        attributes)
+
+    @_io_errors
+    def getRowTs(self, tableName, row, timestamp, attributes):
+        return self.getRowWithColumnsTs(tableName, row, None, timestamp,
+                                        attributes)
+
+    @_io_errors
+    def getRowWithColumnsTs(self, tableName, row, columns, timestamp,
+                            attributes):
+        return self.getRowsWithColumnsTs(tableName, [row], columns,
+                                         timestamp, attributes)
+
+    @_io_errors
+    def getRows(self, tableName, rows, attributes):
+        return self.getRowsWithColumnsTs(tableName, rows, None, None,
+                                         attributes)
+
+    @_io_errors
+    def getRowsWithColumns(self, tableName, rows, columns, attributes):
+        return self.getRowsWithColumnsTs(tableName, rows, columns, None,
+                                         attributes)
+
+    @_io_errors
+    def getRowsTs(self, tableName, rows, timestamp, attributes):
+        return self.getRowsWithColumnsTs(tableName, rows, None, timestamp,
+                                         attributes)
+
+    @_io_errors
+    def getRowsWithColumnsTs(self, tableName, rows, columns, timestamp,
+                             attributes):
+        # Missing rows are left out, like HBase does
+        results = self._table(tableName).rows(
+            rows, columns or None, timestamp, include_timestamp=True)
+        return [_row_result(row, data) for row, data in results if data]
+
+    # Writes
+
+    @_io_errors
+    def mutateRow(self, tableName, row, mutations, attributes):
+        self.mutateRowsTs(tableName, [hbase.BatchMutation(
+            row=row, mutations=mutations)], None, attributes)
+
+    @_io_errors
+    def mutateRowTs(self, tableName, row, mutations, timestamp, attributes):
+        self.mutateRowsTs(tableName, [hbase.BatchMutation(
+            row=row, mutations=mutations)], timestamp, attributes)
+
+    @_io_errors
+    def mutateRows(self, tableName, rowBatches, attributes):
+        self.mutateRowsTs(tableName, rowBatches, None, attributes)
+
+    @_io_errors
+    def mutateRowsTs(self, tableName, rowBatches, timestamp, attributes):
+        # All the mutations are applied at once, in their order
+        table = self._table(tableName)
+        with table.batch(timestamp) as batch:
+            for row_batch in rowBatches:
+                row = row_batch.row
+                for is_delete, mutations in itertools.groupby(
+                        row_batch.mutations, lambda m: m.isDelete):
+                    if is_delete:
+                        batch.delete(row, [m.column for m in mutations])
+                    else:
+                        batch.put(row, {m.column: m.value
+                                        for m in mutations})
+
+    @_io_errors
+    def atomicIncrement(self, tableName, row, column, value):
+        return self._table(tableName).counter_inc(row, column, value)
+
+    @_io_errors
+    def increment(self, increment):
+        self.atomicIncrement(increment.table, increment.row,
+                             increment.column, increment.ammount)
+
+    @_io_errors
+    def incrementRows(self, increments):
+        for increment in increments:
+            self.increment(increment)
+
+    @_io_errors
+    def deleteAll(self, tableName, row, column, attributes):
+        self._table(tableName).delete(row, [column])
+
+    @_io_errors
+    def deleteAllTs(self, tableName, row, column, timestamp, attributes):
+        self._table(tableName).delete(row, [column], timestamp)
+
+    @_io_errors
+    def deleteAllRow(self, tableName, row, attributes):
+        self._table(tableName).delete(row)
+
+    @_io_errors
+    def deleteAllRowTs(self, tableName, row, timestamp, attributes):
+        self._table(tableName).delete(row, timestamp=timestamp)
+
+    # Scanners
+
+    @_io_errors
+    def scannerOpenWithScan(self, tableName, scan, attributes):
+        return self._open_scanner(
+            tableName, scan.columns, scan.sortColumns,
+            row_start=scan.startRow, row_stop=scan.stopRow or None,
+            timestamp=scan.timestamp, filter=scan.filterString,
+            batch_size=scan.caching or 1000, scan_batching=scan.batchSize,
+            reverse=bool(scan.reversed))
+
+    @_io_errors
+    def scannerOpen(self, tableName, startRow, columns, attributes):
+        return self._open_scanner(tableName, columns, row_start=startRow)
+
+    @_io_errors
+    def scannerOpenWithStop(self, tableName, startRow, stopRow, columns,
+                            attributes):
+        return self._open_scanner(tableName, columns, row_start=startRow,
+                                  row_stop=stopRow or None)
+
+    @_io_errors
+    def scannerOpenWithPrefix(self, tableName, startAndPrefix, columns,
+                              attributes):
+        return self._open_scanner(tableName, columns,
+                                  row_prefix=startAndPrefix)
+
+    @_io_errors
+    def scannerOpenTs(self, tableName, startRow, columns, timestamp,
+                      attributes):
+        return self._open_scanner(tableName, columns, row_start=startRow,
+                                  timestamp=timestamp)
+
+    @_io_errors
+    def scannerOpenWithStopTs(self, tableName, startRow, stopRow, columns,
+                              timestamp, attributes):
+        return self._open_scanner(tableName, columns, row_start=startRow,
+                                  row_stop=stopRow or None,
+                                  timestamp=timestamp)
+
+    def _open_scanner(self, table_name, columns, sorted_columns=False,
+                      **kwargs):
+        rows = self._table(table_name).scan(
+            columns=columns or None, include_timestamp=True, **kwargs)
+        with self._scanners_lock:
+            scanner_id = next(self._scanner_ids)
+            self._scanners[scanner_id] = rows, bool(sorted_columns)
+        return scanner_id
+
+    @_io_errors
+    def scannerGet(self, id):
+        return self.scannerGetList(id, 1)
+
+    @_io_errors
+    def scannerGetList(self, id, nbRows):
+        with self._scanners_lock:
+            scanner = self._scanners.get(id)
+        if scanner is None:
+            raise hbase.IllegalArgument(message='scanner %d not found' % id)
+        rows, sorted_columns = scanner
+        return [_row_result(row, data, sorted_columns)
+                for row, data in islice(rows, nbRows)]
+
+    @_io_errors
+    def scannerClose(self, id):
+        with self._scanners_lock:
+            scanner = self._scanners.pop(id, None)
+        if scanner is None:
+            raise hbase.IllegalArgument(message='scanner %d not found' % id)
+        scanner[0].close()
+
+
+def _row_result(row, data, sorted_columns=False):
+    columns = {column: hbase.TCell(value=value, timestamp=ts)
+               for column, (value, ts) in iteritems(data)}
+    if sorted_columns:
+        return hbase.TRowResult(row=row, sortedColumns=[
+            hbase.TColumn(columnName=column, cell=columns[column])
+            for column in sorted(columns)])
+    return hbase.TRowResult(row=row, columns=columns)
+
+
+class ThriftServer(object):
+    """Serves the tables of Connection(host, port) over Thrift.
+
+    transport and protocol must match the ones of the clients, e.g. the
+    arguments of the same name of happybase.Connection.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 transport='buffered', protocol='binary', connection=None):
+        if thriftpy2 is None:
+            raise ImportError('the Thrift server needs thriftpy2')
+
+        self.host = host
+        self.port = port
+        # Without a connection, serves the one of the address it listens on
+        self.handler = Handler(connection)
+        self._socket = TServerSocket(host=host, port=port,
+                                     client_timeout=None)
+        self._server = TThreadedServer(
+            TProcessor(hbase.Hbase, self.handler), self._socket,
+            iprot_factory=PROTOCOLS[protocol](),
+            itrans_factory=TRANSPORTS[transport](),
+            daemon=True)
+        self._closed = threading.Event()
+        self._thread = None
+
+    def listen(self):
+        self._socket.listen()
+        # The actual port, when port 0 picks a free one
+        self.port = self._socket.sock.getsockname()[1]
+        if self.handler.connection is None:
+            self.handler.connection = Connection(host=self.host,
+                                                 port=self.port)
+
+    def serve_forever(self):
+        while not self._closed.is_set():
+            try:
+                client = self._socket.accept()
+            except (socket.error, OSError):
+                if self._closed.is_set():
+                    return
+                raise
+            thread = threading.Thread(target=self._server.handle,
+                                      args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    def start(self):
+        # Listens, then serves on a background thread
+        self.listen()
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='happybase-mock-thrift')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._closed.set()
+        self._socket.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve in-memory tables over the HBase Thrift1 API.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--transport', default='buffered',
+                        choices=['buffered', 'framed'])
+    parser.add_argument('--protocol', default='binary',
+                        choices=['binary', 'compact'])
+    args = parser.parse_args(argv)
+
+    server = ThriftServer(args.host, args.port, args.transport,
+                          args.protocol)
+    server.listen()
+    print('Serving on %s:%d' % (server.host, server.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Tables shared between processes, served by a local server process.
+
+``start()`` runs a server process holding the tables, and sets environment
+variables that are inherited by the processes started afterwards (e.g.
+pytest-xdist or multiprocessing workers). While they are set, ``Connection()``
+returns a proxy to the connection with the same host, port and table prefix
+on the server, so all the processes see the same data.
+
+Every call is a round trip to the server. Scans fetch ``batch_size`` rows at
+a time, and a batch sends all its mutations at once.
+
+The server can also run on its own, with ``python -m happybase_mock.shared``,
+printing the environment variables to set in the client processes.
+"""
+import binascii
+import os
+import sys
+import threading
+from itertools import islice
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
+
+from .batch import Batch
+from .connection import DEFAULT_HOST, DEFAULT_PORT, Connection
+
+# Address of the server, as host:port, and its authentication key (hex)
+ADDRESS_ENV = 'HAPPYBASE_MOCK_SHARED'
+AUTHKEY_ENV = 'HAPPYBASE_MOCK_SHARED_KEY'
+
+
+class SharedServer(object):
+    # A running server process, returned by start()
+
+    def __init__(self, process, address, authkey):
+        self.process = process
+        self.address = address
+        self.authkey = authkey
+
+    def stop(self):
+        if os.environ.get(ADDRESS_ENV) == _format_address(self.address):
+            del os.environ[ADDRESS_ENV]
+            os.environ.pop(AUTHKEY_ENV, None)
+        self.process.terminate()
+        self.process.join()
+
+
+def start(host='127.0.0.1', port=0):
+    # Starts a server process, and makes Connection() use it in this
+    # process and the processes started from now on
+    authkey = os.urandom(16)
+    reader, writer = Pipe(duplex=False)
+    process = Process(target=_run_server, args=(host, port, authkey, writer),
+                      name='happybase-mock-shared')
+    process.daemon = True
+    process.start()
+    address = reader.recv()
+
+    os.environ[ADDRESS_ENV] = _format_address(address)
+    os.environ[AUTHKEY_ENV] = binascii.hexlify(authkey).decode('ascii')
+    return SharedServer(process, address, authkey)
+
+
+def serve(host='127.0.0.1', port=0, authkey=None, ready=None):
+    # Serves the tables of this process until it's killed. ready is called
+    # with the address once the server listens.
+    listener = Listener((host, port), authkey=authkey)
+    if ready is not None:
+        ready(listener.address)
+    while True:
+        conn = listener.accept()
+        thread = threading.Thread(target=_Handler(conn).run)
+        thread.daemon = True
+        thread.start()
+
+
+def _run_server(host, port, authkey, writer):
+    # Forked processes start with the tables of their parent
+    _forget_server()
+    Connection._instances.clear()
+    serve(host, port, authkey, writer.send)
+
+
+# The connections served, by their arguments, kept for as long as the server
+# runs
+_served = {}
+_served_lock = threading.Lock()
+
+
+def _connection(kwargs):
+    key = tuple(sorted(kwargs.items()))
+    with _served_lock:
+        if key not in _served:
+            _served[key] = Connection(**kwargs)
+        return _served[key]
+
+
+def _forget_server():
+    os.environ.pop(ADDRESS_ENV, None)
+    os.environ.pop(AUTHKEY_ENV, None)
+
+
+def _format_address(address):
+    return '%s:%d' % address
+
+
+class _Handler(object):
+    # Serves the requests of one client
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._scanners = {}
+        self._next_scanner = 0
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    request = self._conn.recv()
+                except (EOFError, IOError):
+                    return
+                try:
+                    response = True, self._handle(*request)
+                except Exception as e:
+                    response = False, e
+                try:
+                    self._conn.send(response)
+                except Exception as e:
+                    # The result can't be pickled, nothing was sent
+                    self._conn.send((False, e))
+        finally:
+            self._conn.close()
+
+    def _handle(self, target, method, args, kwargs):
+        if target == 'scanner':
+            return self._scanner(method, *args)
+
+        instance_kwargs, table_name = target
+        obj = _connection(instance_kwargs)
+        if table_name is not None:
+            obj = obj.table(table_name, use_prefix=False)
+
+        if method == 'scan':
+            # Opens a scanner, returns its id and its first rows
+            count = kwargs.get('batch_size', 1000)
+            scanner = obj.scan(*args, **kwargs)
+            self._next_scanner += 1
+            self._scanners[self._next_scanner] = scanner, count
+            return self._next_scanner, self._scanner('next',
+                                                     self._next_scanner)
+        return getattr(obj, method)(*args, **kwargs)
+
+    def _scanner(self, method, scanner_id):
+        if method == 'close':
+            self._scanners.pop(scanner_id, None)
+            return None
+        scanner, count = self._scanners[scanner_id]
+        rows = list(islice(scanner, count))
+        if len(rows) < count:
+            del self._scanners[scanner_id]
+        return rows
+
+
+class _Client(object):
+    # The connection of this process to the server, shared by its threads
+
+    def __init__(self, address, authkey):
+        self._address = address
+        self._authkey = authkey
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def call(self, target, method, *args, **kwargs):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Don't share the socket of a parent process
+                self._conn = Client(self._address, authkey=self._authkey)
+                self._pid = os.getpid()
+            self._conn.send((target, method, args, kwargs))
+            ok, result = self._conn.recv()
+        if not ok:
+            raise result
+        return result
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client():
+    # The client for the server in the environment, or None
+    address = os.environ.get(ADDRESS_ENV)
+    if not address:
+        return None
+    authkey = os.environ.get(AUTHKEY_ENV)
+    key = address, authkey
+    with _clients_lock:
+        if key not in _clients:
+            host, port = address.rsplit(':', 1)
+            _clients[key] = _Client(
+                (host, int(port)),
+                binascii.unhexlify(authkey) if authkey else None)
+        return _clients[key]
+
+
+class RemoteConnection(object):
+    """Stands for the connection with the same arguments on the server."""
+
+    def __init__(self, client, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 timeout=None, autoconnect=True, table_prefix=None,
+                 table_prefix_separator='_', **kwargs):
+        self._client = client
+        self.host = host or DEFAULT_HOST
+        self.port = port or DEFAULT_PORT
+        # Keys the connection on the server, like Connection() does here
+        self._kwargs = {
+            'host': self.host, 'port': self.port,
+            'table_prefix': table_prefix,
+            'table_prefix_separator': table_prefix_separator,
+        }
+        self.table_prefix = table_prefix
+        self.table_prefix_separator = table_prefix_separator
+
+    def table(self, name, use_prefix=True):
+        if use_prefix:
+            name = self._table_name(name)
+        return RemoteTable(name, self)
+
+    def _table_name(self, name):
+        if self.table_prefix is None:
+            return name
+        return self.table_prefix + self.table_prefix_separator + name
+
+    def _call(self, method, *args, **kwargs):
+        return self._client.call((self._kwargs, None), method, *args,
+                                 **kwargs)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+
+
+class RemoteTable(object):
+    """Stands for a table on the server."""
+
+    def __init__(self, name, connection):
+        self.name = name
+        self.connection = connection
+
+    def __repr__(self):
+        return '<%s.%s name=%r>' % (
+            __name__,
+            self.__class__.__name__,
+            self.name,
+        )
+
+    def scan(self, *args, **kwargs):
+        # Arguments are checked by the server right away
+        scanner_id, rows = self._call('scan', *args, **kwargs)
+        return self._scan(scanner_id, rows, kwargs.get('batch_size', 1000))
+
+    def _scan(self, scanner_id, rows, count):
+        done = False
+        try:
+            while True:
+                for row in rows:
+                    yield row
+                if len(rows) < count:
+                    done = True
+                    return
+                rows = self.connection._client.call(
+                    'scanner', 'next', scanner_id)
+        finally:
+            if not done:
+                self.connection._client.call('scanner', 'close', scanner_id)
+
+    def batch(self, timestamp=None, batch_size=None, transaction=False,
+              wal=True):
+        # Mutations are collected locally, and sent with _apply()
+        return Batch(self, timestamp, batch_size, transaction, wal)
+
+    def _apply(self, mutations, timestamp=None, transaction=False):
+        self._call('_apply', mutations, timestamp, transaction)
+
+    def _call(self, method, *args, **kwargs):
+        connection = self.connection
+        return connection._client.call((connection._kwargs, self.name),
+                                       method, *args, **kwargs)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+
+
+def main(argv):
+    host = argv[1] if len(argv) > 1 else '127.0.0.1'
+    port = int(argv[2]) if len(argv) > 2 else 0
+    authkey = os.urandom(16)
+
+    def ready(address):
+        print('%s=%s' % (ADDRESS_ENV, _format_address(address)))
+        print('%s=%s' % (AUTHKEY_ENV,
+                         binascii.hexlify(authkey).decode('ascii')))
+        sys.stdout.flush()
+
+    _forget_server()
+    serve(host, port, authkey, ready)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,187 @@
+"""Saving and loading the tables of a Connection to and from a file.
+
+File layout (integers are big endian)::
+
+    magic        8 bytes, MAGIC
+    header_pos   u64, offset of the header
+    rows         one section per table, see below
+    header       JSON, describing the tables and where their rows are
+
+A table's rows section holds its rows in key order, each one as ``u32 key
+length, key, u32 row length, row``. A row is ``u32 number of columns``
+followed by, for each column, ``u32 name length, name, u32 number of
+versions`` and its versions from the latest to the oldest, each one as
+``i64 timestamp, u32 value length, value``.
+
+Loading a file only reads the header and the row keys; the file is memory
+mapped and every row is decoded the first time it's accessed. The file is
+unmapped once every row was decoded, or the storages were closed.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from six import iteritems
+from six.moves import xrange
+
+from .cell import Cell
+
+MAGIC = b'HBMOCK01'
+
+_U32 = struct.Struct('>I')
+_U64 = struct.Struct('>Q')
+_VERSION = struct.Struct('>qI')
+
+
+def encode_row(data):
+    parts = [_U32.pack(len(data))]
+    for colname, cell in iteritems(data):
+        versions = list(cell.versions())
+        parts.append(_U32.pack(len(colname)))
+        parts.append(colname)
+        parts.append(_U32.pack(len(versions)))
+        for value, ts in versions:
+            parts.append(_VERSION.pack(ts, len(value)))
+            parts.append(value)
+    return b''.join(parts)
+
+
+def decode_row(buf, offset, cell_class=Cell, names=None):
+    # Decodes the row at offset, which starts with the row length
+    return decode_columns(buf, offset + _U32.size, cell_class, names)
+
+
+def decode_columns(buf, offset=0, cell_class=Cell, names=None):
+    # Decodes a row without its length, as returned by encode_row(). Column
+    # names are interned in names if it's given.
+    ncols, = _U32.unpack_from(buf, offset)
+    offset += _U32.size
+
+    data = {}
+    for _ in xrange(ncols):
+        length, = _U32.unpack_from(buf, offset)
+        offset += _U32.size
+        colname = buf[offset:offset + length]
+        offset += length
+        if names is not None:
+            colname = names.setdefault(colname, colname)
+
+        nversions, = _U32.unpack_from(buf, offset)
+        offset += _U32.size
+        timestamps = []
+        values = []
+        for _ in xrange(nversions):
+            ts, length = _VERSION.unpack_from(buf, offset)
+            offset += _VERSION.size
+            timestamps.append(ts)
+            values.append(buf[offset:offset + length])
+            offset += length
+
+        data[colname] = cell_class.from_versions(timestamps, values)
+    return data
+
+
+def dump(connection, path):
+    # Write to a new file first, as tables may still be reading rows from a
+    # snapshot previously loaded from path
+    tmp_path = path + '.tmp'
+    tables = []
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_U64.pack(0))
+
+        for name in sorted(connection._tables):
+            table = connection._tables[name]
+            storage = table._storage
+            with table._lock.read:
+                tables.append({
+                    'name': name,
+                    'families': table._families,
+                    'enabled': table._enabled,
+                    'compact': getattr(storage, 'compact', False),
+                    'rows': storage.count(),
+                    'offset': f.tell(),
+                })
+                for row in storage.keys():
+                    encoded = storage.encoded_row(row)
+                    f.write(_U32.pack(len(row)))
+                    f.write(row)
+                    f.write(_U32.pack(len(encoded)))
+                    f.write(encoded)
+
+        header_pos = f.tell()
+        f.write(json.dumps({'tables': tables}).encode('utf-8'))
+        f.seek(len(MAGIC))
+        f.write(_U64.pack(header_pos))
+
+    getattr(os, 'replace', os.rename)(tmp_path, path)
+
+
+class _Mapping(object):
+    # A snapshot file mapped in memory, shared by the tables loaded from it
+    # and closed once none of them needs it anymore
+
+    def __init__(self, buf, users):
+        self.buf = buf
+        self._users = users
+        self._lock = threading.Lock()
+        if not users:
+            buf.close()
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self.buf.close()
+
+
+def load(connection, path):
+    header_start = len(MAGIC) + _U64.size
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        # mmap can't map an empty file
+        if size < header_start:
+            raise IOError('Not a happybase-mock snapshot: %s' % path)
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if buf[:len(MAGIC)] != MAGIC:
+            raise IOError('Not a happybase-mock snapshot: %s' % path)
+        header_pos, = _U64.unpack_from(buf, len(MAGIC))
+        if not header_start <= header_pos < size:
+            raise IOError('Truncated happybase-mock snapshot: %s' % path)
+        try:
+            header = json.loads(buf[header_pos:].decode('utf-8'))
+        except ValueError:
+            raise IOError('Truncated happybase-mock snapshot: %s' % path)
+    except Exception:
+        buf.close()
+        raise
+
+    mapping = _Mapping(buf, len(header['tables']))
+    for desc in header['tables']:
+        name = desc['name']
+        connection._tables.pop(name, None)
+        table = connection.table(name, use_prefix=False)
+        table._set_families(desc['families'])
+        table._enabled = desc['enabled']
+
+        # Only read the keys, rows are decoded when they are first needed
+        keys = []
+        pending = {}
+        offset = desc['offset']
+        for _ in xrange(desc['rows']):
+            length, = _U32.unpack_from(buf, offset)
+            offset += _U32.size
+            row = buf[offset:offset + length]
+            offset += length
+
+            keys.append(row)
+            pending[row] = offset
+            length, = _U32.unpack_from(buf, offset)
+            offset += _U32.size + length
+
+        table._load_snapshot(mapping, keys, pending,
+                             desc.get('compact', False))
+        connection._tables[name] = table
@@ -0,0 +1,599 @@
+"""Storage backends that hold the rows of a Table.
+
+A backend stores rows by key, each row being a dict of column name to Cell,
+and keeps the keys ordered for range scans. The Table does all the locking,
+so a backend only needs to be safe for concurrent readers. Rows returned by
+``row_for_update()`` may be modified in place, and are written back with
+``put_row()`` (or ``delete_row()`` once they are empty).
+"""
+import sqlite3
+import threading
+import weakref
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from six import iteritems
+
+from . import snapshot
+from .cell import Cell, CompactCell
+
+# Maximum number of parameters of a SQLite query in old versions
+_MAX_PARAMS = 999
+
+
+class Storage(object):
+    """Interface of a storage backend."""
+
+    # Whether checkpoint() is cheap enough for every scan to read from one
+    supports_checkpoints = False
+
+    def get_row(self, row):
+        # Returns the row as a dict of column name to Cell, or None. The
+        # row must not be modified.
+        raise NotImplementedError
+
+    def row_for_update(self, row):
+        # Like get_row(), but the row may be modified before put_row()
+        return self.get_row(row)
+
+    def get_rows(self, rows):
+        # Returns a list of get_row() of every row key, in the same order
+        return [self.get_row(row) for row in rows]
+
+    def put_row(self, row, data):
+        # Stores a row that isn't empty
+        raise NotImplementedError
+
+    def delete_row(self, row):
+        raise NotImplementedError
+
+    def key_range(self, row_start, row_stop=None, count=None,
+                  reverse=False):
+        # Row keys k where row_start <= k < row_stop, at most count of them,
+        # taken from the low end of the range (or the high end if reverse)
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def keys(self, batch_size=1000):
+        # All the row keys in order, read batch_size at a time. Rows may be
+        # written between batches.
+        row_start = b''
+        while True:
+            rows = self.key_range(row_start, None, batch_size)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            row_start = rows[-1] + b'\x00'
+
+    def new_cell(self, data, colname):
+        cell = Cell()
+        data[colname] = cell
+        return cell
+
+    def encoded_row(self, row):
+        # The row in the snapshot row format
+        return snapshot.encode_row(self.get_row(row))
+
+    @contextmanager
+    def bulk(self):
+        # Groups many writes, e.g. the mutations of a batch
+        yield
+
+    def checkpoint(self):
+        # Returns a read-only Storage with the rows as they are now, which
+        # can be passed to restore() later
+        raise NotImplementedError
+
+    def restore(self, checkpoint):
+        raise NotImplementedError
+
+    def drop(self):
+        # Called when the table is deleted
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(Storage):
+    """Keeps the rows in a dict, with a sorted list of the keys.
+
+    With ``compact=True`` the cells use a layout that needs less memory.
+
+    Checkpoints are copy-on-write: taking one doesn't copy anything, and
+    while it's alive, a row is copied the first time it's changed and the
+    original is kept for the checkpoint. Restoring one only writes back the
+    rows that changed since.
+    """
+
+    supports_checkpoints = True
+
+    def __init__(self, compact=False):
+        self.compact = compact
+        if compact:
+            self._cell_class = CompactCell
+            # Shares a single bytes object for a column name across rows
+            self._column_names = {}
+        else:
+            self._cell_class = Cell
+            self._column_names = None
+
+        # A multi-dimentional map, _data[rowkey][colname] = Cell, where the
+        # Cell holds the versions of the cell sorted by timestamp
+        self._data = {}
+
+        # Sorted list of the row keys in _data, used for range scans
+        self._keys = []
+
+        # Rows of a loaded snapshot that haven't been decoded yet, key: row
+        # key, value: offset of the encoded row in the snapshot buffer
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._snapshot = None
+        self._mapping = None
+
+        # Checkpoints, oldest first. _logs[i] holds the rows changed since
+        # checkpoint i was taken as they were then (None if they didn't
+        # exist), _refs[i] is a weak reference to the checkpoint, and _log
+        # is the newest log or None if there are no checkpoints.
+        self._logs = []
+        self._refs = []
+        self._log = None
+        # Incremented whenever a row is added to a log
+        self._log_version = 0
+        self._checkpoint_lock = threading.Lock()
+
+    def get_row(self, row):
+        data = self._data.get(row)
+        if data is None and self._pending:
+            data = self._load_pending(row)
+        return data
+
+    def row_for_update(self, row):
+        data = self.get_row(row)
+        if (data is not None and self._log is not None and
+                self._save(row, data)):
+            # The original is kept for the checkpoints
+            data = _copy_row(data)
+            self._data[row] = data
+        return data
+
+    def put_row(self, row, data):
+        if self._log is not None:
+            self._save(row, self.get_row(row))
+        if row not in self._data:
+            if self._pending.pop(row, None) is None:
+                insort(self._keys, row)
+            elif not self._pending:
+                self._release_snapshot()
+        self._data[row] = data
+
+    def delete_row(self, row):
+        if self._log is not None:
+            self._save(row, self.get_row(row))
+        if self._data.pop(row, None) is None:
+            if self._pending.pop(row, None) is None:
+                return
+            if not self._pending:
+                self._release_snapshot()
+        del self._keys[bisect_left(self._keys, row)]
+
+    def key_range(self, row_start, row_stop=None, count=None,
+                  reverse=False):
+        lo = bisect_left(self._keys, row_start)
+        if row_stop is None:
+            hi = len(self._keys)
+        else:
+            hi = bisect_left(self._keys, row_stop, lo)
+
+        if count is not None:
+            if reverse:
+                lo = max(lo, hi - count)
+            else:
+                hi = min(hi, lo + count)
+
+        rows = self._keys[lo:hi]
+        if reverse:
+            rows.reverse()
+        return rows
+
+    def count(self):
+        return len(self._keys)
+
+    def new_cell(self, data, colname):
+        if self._column_names is not None:
+            colname = self._column_names.setdefault(colname, colname)
+        cell = self._cell_class()
+        data[colname] = cell
+        return cell
+
+    def encoded_row(self, row):
+        with self._pending_lock:
+            offset = self._pending.get(row)
+            if offset is not None:
+                # Copy a row that hasn't been decoded yet as is
+                length, = snapshot._U32.unpack_from(self._snapshot, offset)
+                start = offset + snapshot._U32.size
+                return self._snapshot[start:start + length]
+        return snapshot.encode_row(self._data[row])
+
+    def checkpoint(self):
+        with self._checkpoint_lock:
+            self._collect()
+            log = {}
+            checkpoint = _MemoryCheckpoint(self, log)
+            self._logs.append(log)
+            self._refs.append(weakref.ref(checkpoint))
+            self._log = log
+        return checkpoint
+
+    def restore(self, checkpoint):
+        if getattr(checkpoint, '_storage', None) is not self:
+            raise ValueError('Not a checkpoint of this storage')
+        # Writing the rows back keeps them for the newer checkpoints
+        for row, data in list(iteritems(checkpoint._saved()[0])):
+            if data is None:
+                self.delete_row(row)
+            else:
+                self.put_row(row, _copy_row(data))
+
+    def load_snapshot(self, mapping, keys, pending):
+        # keys: sorted row keys, pending: row key to offset of the row in the
+        # snapshot mapping, which is released once they are all decoded
+        self._release_snapshot()
+        self._data = {}
+        self._keys = keys
+        self._pending = pending
+        self._mapping = mapping
+        self._snapshot = mapping.buf
+        if not pending:
+            self._release_snapshot()
+
+    def close(self):
+        # Rows of a snapshot that weren't decoded are gone
+        with self._pending_lock:
+            self._pending = {}
+            self._release_snapshot()
+
+    def _save(self, row, data):
+        # Keeps the data of a row for the checkpoints before it's changed
+        # for the first time since the newest one. Returns whether it did.
+        if self._refs[-1]() is None:
+            self._collect()
+            if self._log is None:
+                return False
+        if row in self._log:
+            return False
+        self._log[row] = data
+        self._log_version += 1
+        with self._checkpoint_lock:
+            for ref in self._refs:
+                checkpoint = ref()
+                if checkpoint is not None:
+                    checkpoint._saved_row(row, data)
+        return True
+
+    def _collect(self):
+        # Drops the logs of the checkpoints that don't exist anymore. The
+        # rows of a log are still needed by the older checkpoints, so they
+        # are moved to the previous log.
+        logs = []
+        refs = []
+        for log, ref in zip(self._logs, self._refs):
+            if ref() is not None:
+                logs.append(log)
+                refs.append(ref)
+            elif logs:
+                previous = logs[-1]
+                for row, data in iteritems(log):
+                    previous.setdefault(row, data)
+        self._logs = logs
+        self._refs = refs
+        self._log = logs[-1] if logs else None
+
+    def _load_pending(self, row):
+        # Decodes a row of a loaded snapshot on first access
+        with self._pending_lock:
+            data = self._data.get(row)
+            if data is None:
+                offset = self._pending.pop(row, None)
+                if offset is not None:
+                    data = snapshot.decode_row(
+                        self._snapshot, offset, self._cell_class,
+                        self._column_names)
+                    self._data[row] = data
+                    if not self._pending:
+                        # Every row is decoded, release the snapshot
+                        self._release_snapshot()
+        return data
+
+    def _release_snapshot(self):
+        mapping = self._mapping
+        self._mapping = None
+        self._snapshot = None
+        if mapping is not None:
+            mapping.release()
+
+
+class _MemoryCheckpoint(Storage):
+    # The rows of a MemoryStorage as they were when the checkpoint was
+    # taken: the rows in its log and the newer logs, or else the live rows
+
+    def __init__(self, storage, log):
+        self._storage = storage
+        self._log = log
+        # Until the log version changes, no row has changed since the
+        # checkpoint was taken and the live rows can be read directly
+        self._version = storage._log_version
+        # (saved rows, sorted keys of the saved rows that existed, saved
+        # rows that didn't exist), built on first use and then kept up to
+        # date by the storage as rows are saved
+        self._cache = None
+
+    def get_row(self, row):
+        if self._storage._log_version != self._version:
+            saved = self._saved()[0]
+            if row in saved:
+                return saved[row]
+        return self._storage.get_row(row)
+
+    def key_range(self, row_start, row_stop=None, count=None,
+                  reverse=False):
+        storage = self._storage
+        if storage._log_version == self._version:
+            return storage.key_range(row_start, row_stop, count, reverse)
+        saved, existed, created = self._saved()
+
+        # Live keys, minus the rows created since, plus the rows deleted
+        # since. At most len(created) live keys are left out.
+        live = storage.key_range(
+            row_start, row_stop,
+            None if count is None else count + len(created), reverse)
+        rows = [row for row in live if row not in created]
+        lo = bisect_left(existed, row_start)
+        hi = len(existed) if row_stop is None else bisect_left(existed,
+                                                               row_stop)
+        rows.extend(row for row in existed[lo:hi]
+                    if storage.get_row(row) is None)
+        rows.sort(reverse=reverse)
+        return rows if count is None else rows[:count]
+
+    def count(self):
+        storage = self._storage
+        if storage._log_version == self._version:
+            return storage.count()
+        saved, existed, created = self._saved()
+        return (storage.count() -
+                sum(1 for row in created if storage.get_row(row)) +
+                sum(1 for row in existed if storage.get_row(row) is None))
+
+    def _saved(self):
+        storage = self._storage
+        with storage._checkpoint_lock:
+            if self._cache is not None:
+                return self._cache
+
+            saved = {}
+            found = False
+            for log in storage._logs:
+                found = found or log is self._log
+                if found:
+                    for row, data in iteritems(log):
+                        saved.setdefault(row, data)
+            existed = sorted(row for row, data in iteritems(saved)
+                             if data is not None)
+            created = set(row for row, data in iteritems(saved)
+                          if data is None)
+            self._cache = saved, existed, created
+            return self._cache
+
+    def _saved_row(self, row, data):
+        # Called by the storage, under its checkpoint lock, when a row is
+        # saved to the newest log
+        if self._cache is None:
+            return
+        saved, existed, created = self._cache
+        if row in saved:
+            return
+        saved[row] = data
+        if data is None:
+            created.add(row)
+        else:
+            insort(existed, row)
+
+
+def _copy_row(data):
+    return {colname: cell.copy() for colname, cell in iteritems(data)}
+
+
+class SqliteStorage(Storage):
+    """Keeps the rows in a SQLite database, so tables can outgrow memory
+    and outlive the process.
+
+    Rows are stored in the snapshot row format, keyed by row key in a
+    ``WITHOUT ROWID`` table, so that key ranges are read in order straight
+    from the primary key. The database uses write-ahead logging. Several
+    tables can share a database file by using different ``name`` values.
+
+    A checkpoint copies the rows to a temporary table of the connection,
+    which is dropped with the checkpoint, so scans don't take one.
+    """
+
+    def __init__(self, path, name='rows'):
+        self.path = path
+        self.name = name
+        self._table = '"%s"' % name.replace('"', '""')
+
+        # The Table serializes writers, but readers may share the connection
+        self._mutex = threading.RLock()
+        self._db = sqlite3.connect(path, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._create_table()
+        self._in_bulk = False
+
+        # Encoded rows read by the last key_range(), which are usually the
+        # rows read next, so that a scan makes a single query per batch
+        self._prefetched = {}
+        self._checkpoints = 0
+
+    def get_row(self, row):
+        with self._mutex:
+            encoded = self._prefetched.pop(row, None)
+            if encoded is None:
+                found = self._db.execute(
+                    'SELECT data FROM %s WHERE key = ?' % self._table,
+                    (sqlite3.Binary(row),)).fetchone()
+                if found is None:
+                    return None
+                encoded = bytes(found[0])
+        return snapshot.decode_columns(encoded)
+
+    def get_rows(self, rows):
+        # Reads the rows in chunks, with one query per chunk
+        found = {}
+        with self._mutex:
+            for i in range(0, len(rows), _MAX_PARAMS):
+                chunk = rows[i:i + _MAX_PARAMS]
+                query = 'SELECT key, data FROM %s WHERE key IN (%s)' % (
+                    self._table, ', '.join('?' * len(chunk)))
+                for key, encoded in self._db.execute(
+                        query, [sqlite3.Binary(row) for row in chunk]):
+                    found[bytes(key)] = bytes(encoded)
+        return [snapshot.decode_columns(found[row]) if row in found else None
+                for row in rows]
+
+    def put_row(self, row, data):
+        with self._mutex:
+            self._prefetched.pop(row, None)
+            self._db.execute(
+                'INSERT OR REPLACE INTO %s (key, data) VALUES (?, ?)'
+                % self._table,
+                (sqlite3.Binary(row),
+                 sqlite3.Binary(snapshot.encode_row(data))))
+
+    def delete_row(self, row):
+        with self._mutex:
+            self._prefetched.pop(row, None)
+            self._db.execute('DELETE FROM %s WHERE key = ?' % self._table,
+                             (sqlite3.Binary(row),))
+
+    def key_range(self, row_start, row_stop=None, count=None,
+                  reverse=False):
+        query = 'SELECT key, data FROM %s WHERE key >= ?' % self._table
+        params = [sqlite3.Binary(row_start)]
+        if row_stop is not None:
+            query += ' AND key < ?'
+            params.append(sqlite3.Binary(row_stop))
+        query += ' ORDER BY key DESC' if reverse else ' ORDER BY key'
+        if count is not None:
+            query += ' LIMIT ?'
+            params.append(count)
+
+        with self._mutex:
+            found = self._db.execute(query, params).fetchall()
+            self._prefetched = {bytes(key): bytes(data)
+                                for key, data in found}
+        return [bytes(key) for key, _ in found]
+
+    def count(self):
+        with self._mutex:
+            return self._db.execute(
+                'SELECT COUNT(*) FROM %s' % self._table).fetchone()[0]
+
+    def encoded_row(self, row):
+        with self._mutex:
+            return bytes(self._db.execute(
+                'SELECT data FROM %s WHERE key = ?' % self._table,
+                (sqlite3.Binary(row),)).fetchone()[0])
+
+    @contextmanager
+    def bulk(self):
+        with self._mutex:
+            if self._in_bulk:
+                yield
+                return
+            # Writes made before an error are kept, like in memory
+            self._db.execute('BEGIN')
+            self._in_bulk = True
+            try:
+                yield
+            finally:
+                self._in_bulk = False
+                self._db.execute('COMMIT')
+
+    def checkpoint(self):
+        with self._mutex:
+            self._checkpoints += 1
+            table = 'temp."checkpoint_%d"' % self._checkpoints
+            self._db.execute(
+                'CREATE TABLE %s (key BLOB PRIMARY KEY, data BLOB NOT NULL) '
+                'WITHOUT ROWID' % table)
+            self._db.execute('INSERT INTO %s SELECT key, data FROM %s'
+                             % (table, self._table))
+        return _SqliteCheckpoint(self, table)
+
+    def restore(self, checkpoint):
+        if getattr(checkpoint, '_storage', None) is not self:
+            raise ValueError('Not a checkpoint of this storage')
+        with self.bulk():
+            self._prefetched = {}
+            # The table may have been deleted since, and dropped
+            self._create_table()
+            self._db.execute('DELETE FROM %s' % self._table)
+            self._db.execute('INSERT INTO %s SELECT key, data FROM %s'
+                             % (self._table, checkpoint._table))
+
+    def drop(self):
+        with self._mutex:
+            self._prefetched = {}
+            self._db.execute('DROP TABLE IF EXISTS %s' % self._table)
+
+    def _create_table(self):
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS %s '
+            '(key BLOB PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID'
+            % self._table)
+
+    def close(self):
+        with self._mutex:
+            self._prefetched = {}
+            self._db.close()
+
+
+class _SqliteCheckpoint(SqliteStorage):
+    # The rows of a SqliteStorage as they were when the checkpoint was
+    # taken, copied to a temporary table on its connection
+
+    def __init__(self, storage, table):
+        self._storage = storage
+        self.path = storage.path
+        self.name = storage.name
+        self._table = table
+        self._mutex = storage._mutex
+        self._db = storage._db
+        self._in_bulk = False
+        self._prefetched = {}
+
+    def checkpoint(self):
+        raise NotImplementedError
+
+    def restore(self, checkpoint):
+        raise NotImplementedError
+
+    def drop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __del__(self):
+        try:
+            with self._mutex:
+                self._db.execute('DROP TABLE IF EXISTS %s' % self._table)
+        except sqlite3.Error:
+            # The connection of the storage is closed already
+            pass
@@ -1,12 +1,21 @@
-import struct
+import functools
 import time
+from collections import namedtuple
 from six.moves import xrange
-from six import iteritems
+from six import integer_types, iteritems, itervalues
 
+from . import metrics
 from .batch import Batch
+from .bloom import BloomFilters
+from .filters import compile_filter
+from .lock import ReadWriteLock
+from .scanner import Scanner
+from .storage import MemoryStorage
+from .util import encode_columns, encode_data
 
 
 def _check_table_existence(method):
+    @functools.wraps(method)
     def wrap(table, *args, **kwargs):
         if not table._exists():
             raise IOError('TableNotFoundException: %s' % table.name)
@@ -23,18 +32,63 @@ def _str_increment(s):
         if s[i] != '\xff':
             result = s[:i] + chr(ord(s[i]) + 1)
             break
+    if result is None:
+        # No key is greater than every key with this prefix
+        return None
     return result.encode('utf-8')
 
 
+# time_to_live (in seconds) that HBase uses for cells that never expire
+_FOREVER = 2 ** 31 - 1
+
+# Precomputed options of a column family that are needed on the put path
+_FamilyInfo = namedtuple('_FamilyInfo', 'name max_versions time_to_live')
+
+
+class _Projection(object):
+    # The columns argument of a read, compiled once per call: the columns
+    # asked for by name, and the names of the families asked for as a whole
+
+    __slots__ = ('columns', 'families')
+
+    def __init__(self, columns, families):
+        self.columns = columns
+        self.families = families
+
+    def cells(self, data, family):
+        # (column name, cell) of the selected columns of a row, family is
+        # Table._family
+        if not self.families:
+            return [(colname, data[colname]) for colname in self.columns
+                    if colname in data]
+        columns = self.columns
+        families = self.families
+        return [(colname, cell) for colname, cell in iteritems(data)
+                if colname in columns or family(colname).name in families]
+
+
 class Table(object):
 
-    def __init__(self, name, connection):
+    def __init__(self, name, connection, compact=False, storage=None):
         self.name = name
         self.connection = connection
         self._enabled = True
 
-        # A multi-dimentional map, _data[rowkey][colname][timestamp] = value
-        self._data = {}
+        # Holds the rows, see storage.Storage
+        if storage is None:
+            storage = MemoryStorage(compact)
+        self._storage = storage
+
+        # Readers share the lock, writers (including a whole batch) take it
+        # exclusively
+        self._lock = ReadWriteLock()
+
+        self._families = {}
+        self._family_infos = {}
+        self._column_families = {}
+        self._expiring_families = []
+        # Bloom filters of the families that have one, see bloom.py
+        self._blooms = None
 
     def __repr__(self):
         return '<%s.%s name=%r>' % (
@@ -63,47 +117,56 @@ class Table(object):
             'version': 1
         }]
 
+    @metrics.instrumented(metrics.row_volume)
     @_check_table_existence
     def row(self, row, columns=None, timestamp=None, include_timestamp=False):
         if not isinstance(row, bytes):
             row = row.encode('utf-8')
-        data = self._data.get(row, {})
-        result = {}
-
-        if not columns:
-            columns = data.keys()
-
-        for colname in columns:
-            if colname in data:
-                cell = data[colname]
-                timestamps = sorted(cell.keys(), reverse=True)
-                if timestamp is None:
-                    # Use latest version if timestamp isn't specified
-                    ts = timestamps[0]
-                    if include_timestamp:
-                        result[colname] = cell[ts], ts
-                    else:
-                        result[colname] = cell[ts]
-                else:
-                    # Find the first ts < timestamp
-                    for ts in timestamps:
-                        if ts < timestamp:
-                            if include_timestamp:
-                                result[colname] = cell[ts], ts
-                            else:
-                                result[colname] = cell[ts]
-                            break
-        return result
-
+        projection = self._projection(columns)
+        with self._lock.read:
+            if self._blooms is None:
+                data = self._storage.get_row(row)
+            else:
+                data = self._get_row(row, self._blooms.checks(projection))
+            return self._row(data, projection, timestamp, include_timestamp,
+                             self._oldest_timestamps())
+
+    @metrics.instrumented(metrics.rows_volume)
     @_check_table_existence
     def rows(self, rows, columns=None, timestamp=None,
-             include_timestamp=False):
+             include_timestamp=False, as_dict=False):
+        # With as_dict=True, returns a dict of row key to row data instead of
+        # a list of (row key, row data) tuples
+        rows = list(rows)
+        keys = [row if isinstance(row, bytes) else row.encode('utf-8')
+                for row in rows]
+        projection = self._projection(columns)
+
+        # Every row is read once, in key order
+        unique = sorted(set(keys))
+        with self._lock.read:
+            oldest = self._oldest_timestamps()
+            found = {
+                key: self._row(data, projection, timestamp,
+                               include_timestamp, oldest)
+                for key, data in zip(unique, self._get_rows(
+                    unique, self._bloom_checks(projection)))
+            }
+        if as_dict:
+            return found
+
         result = []
-        for row in rows:
-            data = self.row(row, columns, timestamp, include_timestamp)
+        returned = set()
+        for row, key in zip(rows, keys):
+            data = found[key]
+            if key in returned:
+                # A row asked for more than once gets its own copy
+                data = dict(data)
+            returned.add(key)
             result.append((row, data))
         return result
 
+    @metrics.instrumented(metrics.cells_volume)
     @_check_table_existence
     def cells(self, row, column, versions=None, timestamp=None,
               include_timestamp=False):
@@ -111,28 +174,47 @@ class Table(object):
             row = row.encode('utf-8')
         if not isinstance(column, bytes):
             column = column.encode('utf-8')
+        if versions is not None and versions < 1:
+            raise ValueError(
+                "'versions' argument must be at least 1 (or None)")
+
         result = []
-        timestamps = sorted(self._data.get(row, {}).get(column, {}).keys(),
-                            reverse=True)
-        for ts in timestamps:
-            value = self._data[row][column][ts]
-            if timestamp is None or ts < timestamp:
+        checks = None
+        if self._blooms is not None:
+            checks = self._blooms.checks(self._projection([column]))
+        with self._lock.read:
+            cell = (self._get_row(row, checks) or {}).get(column)
+            if cell is None:
+                return result
+
+            oldest = self._oldest_timestamps()
+            for value, ts in cell.versions(timestamp):
+                if oldest and self._expired(column, ts, oldest):
+                    # Older versions are expired too
+                    break
                 if include_timestamp:
                     result.append((value, ts))
                 else:
                     result.append(value)
+                if len(result) == versions:
+                    break
         return result
 
+    @metrics.instrumented()
     @_check_table_existence
     def scan(self, row_start=None, row_stop=None, row_prefix=None,
-             columns=None, timestamp=None, include_timestamp=False,
-             batch_size=1000, scan_batching=None, limit=None,
-             reverse=False, sorted_columns=False, **kwargs):
-        # encode columns key and data (for python3 compatibility)
-        if columns:
-          for i, col in enumerate(columns):
-            if not isinstance(col, bytes):
-                columns[i] = col.encode('utf-8')
+             columns=None, filter=None, timestamp=None,
+             include_timestamp=False, batch_size=1000, scan_batching=None,
+             limit=None, reverse=False, sorted_columns=False, **kwargs):
+        if batch_size < 1:
+            raise ValueError("'batch_size' must be >= 1")
+
+        if limit is not None and limit < 1:
+            raise ValueError("'limit' must be >= 1")
+
+        if scan_batching is not None and scan_batching < 1:
+            raise ValueError("'scan_batching' must be >= 1")
+
         if row_prefix is not None:
             if not isinstance(row_prefix, bytes):
                 row_prefix = row_prefix.encode('utf-8')
@@ -143,137 +225,453 @@ class Table(object):
 
             row_start = row_prefix
             row_stop = _str_increment(row_prefix)
-
-        if row_start is None:
-            row_start = b''
         else:
-            if not isinstance(row_start, bytes):
+            if row_start is not None and not isinstance(row_start, bytes):
                 row_start = row_start.encode('utf-8')
-
-        rows = filter(lambda k: k >= row_start, self._data)
-        if row_stop is not None:
-            if not isinstance(row_stop, bytes):
+            if row_stop is not None and not isinstance(row_stop, bytes):
                 row_stop = row_stop.encode('utf-8')
-            rows = filter(lambda k: k < row_stop, rows)
 
-        result = sorted([
-            (row, self.row(row, columns, timestamp, include_timestamp))
-            for row in rows
-        ], reverse=reverse)
+            if reverse:
+                # Like HBase, a reverse scan goes down from row_start,
+                # inclusive, to row_stop, exclusive. Read the keys in between
+                # from the high end.
+                row_start, row_stop = (
+                    b'' if row_stop is None else row_stop + b'\x00',
+                    row_start + b'\x00' if row_start else None)
 
-        if limit:
-            if len(result) < limit:
-                result = result[:limit]
-        
-        return iter(result)
+        if row_start is None:
+            row_start = b''
 
+        if filter is not None:
+            filter = compile_filter(filter, reverse)
+            if filter.prefix:
+                # Only rows with the prefix can match, narrow the range
+                row_start = max(row_start, filter.prefix)
+                prefix_stop = _str_increment(filter.prefix)
+                if prefix_stop is not None and (
+                        row_stop is None or prefix_stop < row_stop):
+                    row_stop = prefix_stop
+
+        return self._scanner(row_start, row_stop, self._projection(columns),
+                             filter, timestamp, include_timestamp, batch_size,
+                             scan_batching, limit, reverse)
+
+    @metrics.instrumented(metrics.put_volume)
     @_check_table_existence
     def put(self, row, data, timestamp=None, wal=True):
         # encode row key and data before put (for python3 compatibility)
         if not isinstance(row, bytes):
             row = row.encode('utf-8')
-        data = {
-            (k if isinstance(k, bytes) else k.encode('utf-8')):
-            (v if isinstance(v, bytes) else v.encode('utf-8'))
-            for k, v in iteritems(data)
-        }
+        data = encode_data(data)
 
         # Check data against column families
-        for colname in data:
-            cf = colname.decode('utf-8').split(':')[0]
-            if cf not in self._families:
-                raise IOError('NoSuchColumnFamilyException: %s' % cf)
+        self._check_columns(data)
 
         if timestamp is None:
             timestamp = int(time.time() * 1000)
+        with self._lock.write:
+            self._put(row, data, timestamp)
 
-        columns = self._data.get(row)
-        if columns is None:
-            columns = {}
-            self._data[row] = columns
-
-        for colname, value in iteritems(data):
-            column = columns.get(colname)
-            if column is None:
-                column = {}
-                columns[colname] = column
-
-            column[timestamp] = value
+    @metrics.instrumented(metrics.delete_volume)
+    @_check_table_existence
+    def delete(self, row, columns=None, timestamp=None, wal=True):
+        if not isinstance(row, bytes):
+            row = row.encode('utf-8')
+        columns = encode_columns(columns)
+        with self._lock.write:
+            self._delete(row, columns, timestamp)
 
-            # Check if it exceeds max_versions
-            cf = colname.decode('utf-8').split(':')[0]
-            max_versions = self._max_versions(cf)
-            if len(column) > max_versions:
-                # Delete cell with minimum timestamp
-                del column[min(column.keys())]
+    def batch(self, timestamp=None, batch_size=None, transaction=False,
+              wal=True):
+        return Batch(self, timestamp, batch_size, transaction, wal)
 
+    @metrics.instrumented(metrics.counter_read_volume)
     @_check_table_existence
-    def delete(self, row, columns=None, timestamp=None, wal=True):
+    def counter_get(self, row, column):
         if not isinstance(row, bytes):
             row = row.encode('utf-8')
-        if columns:
-            columns = [
-                column if isinstance(column, bytes)
-                else column.encode('utf-8')
-                for column in columns
-            ]
+        if not isinstance(column, bytes):
+            column = column.encode('utf-8')
+        checks = None
+        if self._blooms is not None:
+            checks = self._blooms.checks(self._projection([column]))
+        with self._lock.read:
+            cell = (self._get_row(row, checks) or {}).get(column)
+            if cell is None or self._expired_cell(column, cell):
+                return 0
+            return cell.counter()
+
+    @metrics.instrumented(metrics.counter_write_volume)
+    @_check_table_existence
+    def counter_set(self, row, column, value=0):
+        self._counter_update(row, column, value, False)
+
+    @metrics.instrumented(metrics.counter_update_volume)
+    @_check_table_existence
+    def counter_inc(self, row, column, value=1):
+        return self._counter_update(row, column, value, True)
+
+    @metrics.instrumented(metrics.counter_update_volume)
+    @_check_table_existence
+    def counter_dec(self, row, column, value=1):
+        return self._counter_update(row, column, -value, True)
+
+    def checkpoint(self):
+        # Returns the current state of the table, to be restored later with
+        # restore(). In memory, taking a checkpoint doesn't copy any data;
+        # while it's alive, rows are copied when they are first changed.
+        with self._lock.read:
+            return self._storage.checkpoint()
+
+    def restore(self, checkpoint):
+        # Puts the table back in the state of a checkpoint, by writing back
+        # the rows changed since it was taken
+        with self._lock.write:
+            self._storage.restore(checkpoint)
+            if self._blooms is not None:
+                self._blooms.invalidate()
+
+    def bloom_filter_stats(self):
+        # Statistics of the bloom filters of the families, by family name.
+        # negatives are the lookups answered without reading the storage,
+        # false_positives the ones that read a row without the cells.
+        if self._blooms is None:
+            return {}
+        return self._blooms.stats()
+
+    @metrics.instrumented(metrics.batch_volume, name='batch')
+    @_check_table_existence
+    def _apply(self, mutations, timestamp=None, transaction=False):
+        # Applies the mutations of a batch in one go. mutations is a dict of
+        # encoded row key to a list of (data, columns) tuples, where data is
+        # a dict for puts and None for deletes.
+        for ops in itervalues(mutations):
+            for data, _ in ops:
+                if data is not None:
+                    self._check_columns(data)
+
+        put_timestamp = timestamp
+        if put_timestamp is None:
+            put_timestamp = int(time.time() * 1000)
+
+        with self._lock.write, self._storage.bulk():
+            if transaction:
+                # Keep a copy of the affected rows to roll back to
+                saved = [(row, self._copy_row(row)) for row in mutations]
+
+            try:
+                for row, ops in iteritems(mutations):
+                    for data, columns in ops:
+                        if data is not None:
+                            self._put(row, data, put_timestamp)
+                        else:
+                            self._delete(row, columns, timestamp)
+            except Exception:
+                if transaction:
+                    for row, data in saved:
+                        self._restore_row(row, data)
+                raise
+
+    def _put(self, row, data, timestamp):
+        # Columns must have been checked with _check_columns() already
+        if not data:
+            return
+
+        storage = self._storage
+        columns = storage.row_for_update(row)
+        if columns is None:
+            columns = {}
+        families = self._column_families
+        for colname, value in iteritems(data):
+            cell = columns.get(colname)
+            if cell is None:
+                cell = storage.new_cell(columns, colname)
+
+            cell.put(timestamp, value, families[colname].max_versions)
+        storage.put_row(row, columns)
+        if self._blooms is not None:
+            self._blooms.add(row, data)
+
+    def _delete(self, row, columns, timestamp):
         if not columns and timestamp is None:
             # Delete whole row
-            self._data.pop(row, None)
-        elif row in self._data:
-            data = self._data[row]
+            self._storage.delete_row(row)
+        else:
+            data = self._storage.row_for_update(row)
+            if data is None:
+                return
+
             if not columns:
                 # Delete all columns if not specified
                 columns = data.keys()
+            elif any(b':' not in colname for colname in columns):
+                # A family name deletes all the columns of the family
+                columns = [colname for colname, _ in self._projection(
+                    columns).cells(data, self._family)]
 
             if timestamp is None:
                 timestamp = int(time.time() * 1000)
 
-            to_be_deleted = []
-            for colname in columns:
-                for ts in data[colname]:
-                    if ts <= timestamp:
-                        to_be_deleted.append((colname, ts))
-
-            for colname, ts in to_be_deleted:
-                del data[colname][ts]
-                if not data[colname]:
+            for colname in list(columns):
+                cell = data.get(colname)
+                if cell is None:
+                    continue
+                cell.delete(timestamp)
+                if not cell:
                     # Delete a column if it doesn't have any timestamps
                     del data[colname]
 
-    def batch(self, timestamp=None, batch_size=None, transaction=False,
-              wal=True):
-        return Batch(self, timestamp, batch_size, transaction, wal)
+            if data:
+                self._storage.put_row(row, data)
+            else:
+                # Delete a row if it doesn't have any columns
+                self._storage.delete_row(row)
 
-    def counter_get(self, row, column):
-        # Decode as long integer, big endian
-        value = self.row(row, (column,)).get(column)
-        if not value:
-            return 0
-        return struct.unpack('>q', value)[0]
+    def _counter_update(self, row, column, value, increment):
+        # Counters are 64-bit integers, stored as such
+        if not isinstance(value, integer_types):
+            raise TypeError("'value' must be an integer")
+        if not isinstance(row, bytes):
+            row = row.encode('utf-8')
+        if not isinstance(column, bytes):
+            column = column.encode('utf-8')
+        self._check_columns((column,))
+
+        timestamp = int(time.time() * 1000)
+        with self._lock.write:
+            data = self._storage.row_for_update(row)
+            if data is None:
+                data = {}
+            cell = data.get(column)
+            if cell is None:
+                cell = self._storage.new_cell(data, column)
+            elif increment and not self._expired_cell(column, cell):
+                value += cell.counter()
+
+            # The counter keeps a single version, stored as an integer
+            cell.set_counter(timestamp, value)
+            self._storage.put_row(row, data)
+            if self._blooms is not None:
+                self._blooms.add(row, (column,))
+        return value
+
+    def _row(self, data, projection, timestamp, include_timestamp, oldest):
+        # Builds the result of a row from its data, oldest is the result of
+        # _oldest_timestamps()
+        result = {}
+        if not data:
+            return result
 
-    @_check_table_existence
-    def counter_set(self, row, column, value=0):
-        # Encode as long integer, big endian
-        value = struct.pack('>q', value)
-        self.delete(row, (column,))
-        self.put(row, {column: value})
+        if projection is None:
+            cells = iteritems(data)
+        else:
+            cells = projection.cells(data, self._family)
+
+        for colname, cell in cells:
+            # Latest version, or the first one older than timestamp
+            version = cell.get(timestamp)
+            if version is None:
+                continue
+            if oldest and self._expired(colname, version[1], oldest):
+                continue
+
+            if include_timestamp:
+                result[colname] = version
+            else:
+                result[colname] = version[0]
+        return result
 
-    @_check_table_existence
-    def counter_inc(self, row, column, value=1):
-        orig_value = self.counter_get(row, column)
-        self.counter_set(row, column, orig_value + value)
+    def _scanner(self, row_start, row_stop, projection, filter, timestamp,
+                 include_timestamp, batch_size, scan_batching, limit, reverse,
+                 skip=None):
+        # Arguments are validated eagerly, rows are produced lazily from a
+        # checkpoint, so that the scan doesn't see later writes
+        storage = self._storage
+        if storage.supports_checkpoints:
+            with self._lock.read:
+                storage = storage.checkpoint()
+        return Scanner(self, storage, row_start, row_stop, projection, filter,
+                       timestamp, include_timestamp, batch_size,
+                       scan_batching, limit, reverse, skip)
+
+    def _filtered_row(self, storage, row, projection, filter, timestamp,
+                      include_timestamp, oldest):
+        if not filter.row_key(row):
+            return {}
+
+        data = storage.get_row(row) or {}
+        if projection is not None:
+            data = projection.cells(data, self._family)
+        else:
+            data = iteritems(data)
+        cells = []
+        for colname, cell in data:
+            version = cell.get(timestamp)
+            if version is None:
+                continue
+            if oldest and self._expired(colname, version[1], oldest):
+                continue
+            cells.append((colname, version[0], version[1]))
+        cells.sort()
+
+        if not filter.accept_row(row, cells):
+            return {}
 
-    @_check_table_existence
-    def counter_dec(self, row, column, value=1):
-        orig_value = self.counter_get(row, column)
-        self.counter_set(row, column, orig_value - value)
+        result = {}
+        for colname, value, ts in filter.select(row, cells):
+            if include_timestamp:
+                result[colname] = value, ts
+            else:
+                result[colname] = value
+        return result
+
+    def _compact(self, batch_size=1000):
+        # Purges expired versions, versions beyond max_versions (e.g. when
+        # loaded from a snapshot), and rows that are left empty. Like scans,
+        # only holds the lock while a batch of rows is compacted, so that
+        # other threads can read and write in between.
+        storage = self._storage
+        row_start = b''
+        while True:
+            with self._lock.write, storage.bulk():
+                rows = storage.key_range(row_start, None, batch_size)
+                oldest = self._oldest_timestamps() or {}
+                for row in rows:
+                    self._compact_row(storage, row, oldest)
+                if len(rows) < batch_size:
+                    if self._blooms is not None:
+                        # Drops the deleted rows and cells from the filters
+                        self._blooms.invalidate()
+                    return
+            row_start = rows[-1] + b'\x00'
+
+    def _compact_row(self, storage, row, oldest):
+        data = storage.row_for_update(row)
+        for colname, cell in list(iteritems(data)):
+            family = self._family(colname)
+            cell.trim(family.max_versions)
+            limit = oldest.get(family.name)
+            if limit is not None:
+                cell.delete(limit - 1)
+            if not cell:
+                del data[colname]
+        if data:
+            storage.put_row(row, data)
+        else:
+            storage.delete_row(row)
+
+    def _oldest_timestamps(self):
+        # key: family name, value: timestamp of the oldest version that is
+        # not expired yet, only for families with a time_to_live
+        if not self._expiring_families:
+            return None
+        now = int(time.time() * 1000)
+        return {
+            family.name: now - family.time_to_live * 1000
+            for family in self._expiring_families
+        }
+
+    def _expired(self, colname, timestamp, oldest):
+        family = self._family(colname)
+        limit = oldest.get(family.name)
+        return limit is not None and timestamp < limit
+
+    def _expired_cell(self, colname, cell):
+        oldest = self._oldest_timestamps()
+        return bool(oldest) and self._expired(colname, cell.latest()[1],
+                                              oldest)
+
+    def _copy_row(self, row):
+        data = self._storage.get_row(row)
+        if data is None:
+            return None
+        return {colname: cell.copy() for colname, cell in iteritems(data)}
+
+    def _restore_row(self, row, data):
+        if data is None:
+            self._storage.delete_row(row)
+        else:
+            self._storage.put_row(row, data)
+
+    def _load_snapshot(self, mapping, keys, pending, compact):
+        # Rows of a snapshot file are kept in memory, and only decoded when
+        # they are first accessed
+        self._storage = MemoryStorage(compact)
+        self._storage.load_snapshot(mapping, keys, pending)
+        if self._blooms is not None:
+            self._blooms.invalidate()
+
+    def _bloom_checks(self, projection):
+        if self._blooms is None:
+            return None
+        return self._blooms.checks(projection)
+
+    def _get_row(self, row, checks):
+        # The stored row, or None if the bloom filters rule out the cells
+        # the read asks for. checks come from _bloom_checks().
+        if checks is None:
+            return self._storage.get_row(row)
+        passed = self._blooms.might_contain(self._storage, row, checks)
+        if not passed:
+            return None
+        data = self._storage.get_row(row)
+        self._blooms.verify(data, passed)
+        return data
+
+    def _get_rows(self, rows, checks):
+        # Like _get_row(), for a list of rows read at once
+        if checks is None:
+            return self._storage.get_rows(rows)
+        blooms = self._blooms
+        passed = [blooms.might_contain(self._storage, row, checks)
+                  for row in rows]
+        candidates = [row for row, p in zip(rows, passed) if p]
+        found = dict(zip(candidates, self._storage.get_rows(candidates)))
+        for row, p in zip(rows, passed):
+            if p:
+                blooms.verify(found[row], p)
+        return [found.get(row) for row in rows]
 
     def _exists(self):
         return self.name in self.connection._tables
 
-    def _max_versions(self, cf):
-        return self._families[cf]['max_versions']
+    def _check_columns(self, columns):
+        families = self._column_families
+        for colname in columns:
+            if colname not in families:
+                self._column_family(colname)
+
+    def _projection(self, columns):
+        # Compiles the columns argument of a read, where a column is either
+        # a family name, selecting the whole family, or family:qualifier
+        columns = encode_columns(columns)
+        if not columns:
+            return None
+        names = set()
+        families = set()
+        for colname in columns:
+            if b':' in colname:
+                names.add(colname)
+            else:
+                family = self._column_families.get(colname)
+                if family is not None:
+                    families.add(family.name)
+        return _Projection(names, families)
+
+    def _family(self, colname):
+        return (self._column_families.get(colname) or
+                self._column_family(colname))
+
+    def _column_family(self, colname):
+        # Looks up the family of a column that hasn't been seen before, and
+        # caches it so that later lookups are a single dict access
+        cf = colname.decode('utf-8').split(':')[0]
+        try:
+            family = self._family_infos[cf]
+        except KeyError:
+            raise IOError('NoSuchColumnFamilyException: %s' % cf)
+        self._column_families[colname] = family
+        return family
 
     def _set_families(self, families):
         # Default family options
@@ -293,3 +691,21 @@ class Table(object):
             family_options['name'] = name
             family_options.update(opts)
             self._families[name] = family_options
+
+        # Cache of column name (bytes) to _FamilyInfo, prepopulated with the
+        # family names themselves
+        self._family_infos = {}
+        self._column_families = {}
+        self._expiring_families = []
+        for name, opts in iteritems(self._families):
+            family = _FamilyInfo(name, opts['max_versions'],
+                                 opts['time_to_live'])
+            self._family_infos[name] = family
+            if 0 < family.time_to_live < _FOREVER:
+                self._expiring_families.append(family)
+            encoded = name if isinstance(name, bytes) else name.encode('utf-8')
+            self._column_families[encoded] = family
+            self._column_families[encoded + b':'] = family
+
+        blooms = BloomFilters(self._families)
+        self._blooms = blooms if blooms else None
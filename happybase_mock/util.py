@@ -0,0 +1,20 @@
+from six import iteritems
+
+
+def encode_columns(columns):
+    # encode column names (for python3 compatibility)
+    if not columns:
+        return columns
+    return [
+        column if isinstance(column, bytes) else column.encode('utf-8')
+        for column in columns
+    ]
+
+
+def encode_data(data):
+    # encode column names and values (for python3 compatibility)
+    return {
+        (k if isinstance(k, bytes) else k.encode('utf-8')):
+        (v if isinstance(v, bytes) else v.encode('utf-8'))
+        for k, v in iteritems(data)
+    }
@@ -50,7 +50,9 @@ setup(
     author_email='eliang.cs@gmail.com',
     license='MIT',
     packages=['happybase_mock'],
+    package_data={'happybase_mock': ['Hbase.thrift']},
     install_requires=parse_requirements('requirements.txt'),
+    extras_require={'server': ['thriftpy2']},
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Console',
@@ -0,0 +1,6 @@
+import sys
+
+# The asyncio API needs Python 3.6+
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_aio.py')
@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import BaseTestCase
+from happybase_mock.aio import AsyncConnection
+
+
+class TestAsync(BaseTestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.conn = AsyncConnection()
+        self.wait(self.conn.create_table('person', {'d': dict()}))
+        self.table = self.conn.table('person')
+
+    def tearDown(self):
+        self.loop.close()
+        super(TestAsync, self).tearDown()
+
+    def wait(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_connection(self):
+        self.assertEqual(self.wait(self.conn.tables()), ['person'])
+        self.wait(self.conn.disable_table('person'))
+        self.assertFalse(self.wait(self.conn.is_table_enabled('person')))
+        self.wait(self.conn.delete_table('person'))
+        self.assertEqual(self.wait(self.conn.tables()), [])
+
+    def test_read_write(self):
+        self.wait(self.table.put(b'1', {b'd:name': b'John'}, timestamp=1))
+        self.assertEqual(self.wait(self.table.row(b'1')), {b'd:name': b'John'})
+        self.assertEqual(self.wait(self.table.rows([b'1'])),
+                         [(b'1', {b'd:name': b'John'})])
+        self.assertEqual(
+            self.wait(self.table.cells(b'1', b'd:name',
+                                      include_timestamp=True)),
+            [(b'John', 1)])
+        self.wait(self.table.delete(b'1'))
+        self.assertEqual(self.wait(self.table.row(b'1')), {})
+
+        self.assertEqual(self.wait(self.table.counter_inc(b'1', b'd:n')), 1)
+        self.wait(self.table.counter_set(b'1', b'd:n', 5))
+        self.assertEqual(self.wait(self.table.counter_dec(b'1', b'd:n')), 4)
+        self.assertEqual(self.wait(self.table.counter_get(b'1', b'd:n')), 4)
+
+    def test_batch(self):
+        async def write():
+            async with self.table.batch() as b:
+                await b.put(b'1', {b'd:name': b'John'})
+                await b.put(b'2', {b'd:name': b'Jane'})
+                await b.delete(b'1')
+
+        self.wait(write())
+        self.assertEqual([k for k, _ in self.table.table.scan()], [b'2'])
+
+        async def fail():
+            async with self.table.batch(transaction=True) as b:
+                await b.put(b'3', {b'd:name': b'Joe'})
+                raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.wait(fail())
+        self.assertEqual(self.wait(self.table.row(b'3')), {})
+
+    def test_scan_yields_between_batches(self):
+        for i in range(5):
+            self.table.table.put(str(i), {b'd:v': b'x'})
+        events = []
+
+        async def scan():
+            async for key, _ in self.table.scan(batch_size=2):
+                events.append(key)
+
+        async def other():
+            for _ in range(3):
+                events.append('other')
+                await asyncio.sleep(0)
+
+        async def both():
+            await asyncio.gather(scan(), other())
+
+        self.wait(both())
+        self.assertEqual(events, [b'0', b'1', 'other', b'2', b'3', 'other',
+                                  b'4', 'other'])
+
+        with self.assertRaises(ValueError):
+            self.table.scan(batch_size=0)
+
+    def test_scan_positional_arguments(self):
+        for i in range(5):
+            self.table.table.put(str(i), {b'd:v': b'x', b'd:w': b'y'})
+
+        async def scan(*args, **kwargs):
+            return [row async for row in self.table.scan(*args, **kwargs)]
+
+        self.assertEqual([k for k, _ in self.wait(scan(b'3'))], [b'3', b'4'])
+        self.assertEqual(self.wait(scan(b'1', b'3', None, [b'd:v'])),
+                         [(b'1', {b'd:v': b'x'}), (b'2', {b'd:v': b'x'})])
+        self.assertEqual(
+            [k for k, _ in self.wait(scan(b'1', batch_size=1, limit=2))],
+            [b'1', b'2'])
+
+    def test_executor(self):
+        with ThreadPoolExecutor(1) as executor:
+            conn = AsyncConnection(executor=executor)
+            table = conn.table('person')
+            self.wait(table.put(b'1', {b'd:name': b'John'}))
+            self.assertEqual(self.wait(table.row(b'1')), {b'd:name': b'John'})
+
+            async def scan():
+                return [key async for key, _ in table.scan()]
+
+            self.assertEqual(self.wait(scan()), [b'1'])
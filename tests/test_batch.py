@@ -52,3 +52,86 @@ class TestBatch(BaseTestCase):
             (b'frozen', {b'd:title': b'Frozen'}),
             (b'goodfellas', {b'd:title': b'Goodfellas'})
         ])
+
+    def test_merge_puts(self):
+        self.batch.put(b'matrix', {b'd:title': b'The Matrix'})
+        self.batch.put(b'matrix', {b'd:year': b'1999'})
+        self.batch.delete(b'matrix', columns=[b'd:title'])
+        self.batch.put('matrix', {'d:rating': '8.7'})
+        self.assertEqual(len(self.batch._mutations[b'matrix']), 3)
+
+        self.batch.send()
+        self.assertEqual(self.table.row(b'matrix'), {
+            b'd:year': b'1999', b'd:rating': b'8.7'
+        })
+
+    def test_timestamp(self):
+        batch = self.table.batch(timestamp=10)
+        batch.put(b'matrix', {b'd:title': b'The Matrix'})
+        batch.send()
+        self.assertEqual(
+            self.table.row(b'matrix', include_timestamp=True),
+            {b'd:title': (b'The Matrix', 10)})
+
+    def test_batch_size(self):
+        batch = self.table.batch(batch_size=2)
+        batch.put(b'matrix', {b'd:title': b'The Matrix'})
+        self.assertEqual(list(self.table.scan()), [])
+
+        # Sent automatically once batch_size mutations are buffered
+        batch.put(b'godfather', {b'd:title': b'The Godfather'})
+        self.assertEqual(len(list(self.table.scan())), 2)
+        self.assertEqual(batch._mutations, {})
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(TypeError):
+            self.table.batch(batch_size=10, transaction=True)
+        with self.assertRaises(ValueError):
+            self.table.batch(batch_size=0)
+
+    def test_no_such_column_family(self):
+        self.batch.put(b'matrix', {b'd:title': b'The Matrix'})
+        self.batch.put(b'godfather', {b'bad_cf:title': b'The Godfather'})
+        with self.assertRaises(IOError):
+            self.batch.send()
+
+        # Columns are checked before anything is written
+        self.assertEqual(list(self.table.scan()), [])
+
+    def test_transaction_discarded_on_exception(self):
+        with self.assertRaises(ValueError):
+            with self.table.batch(transaction=True) as batch:
+                batch.put(b'matrix', {b'd:title': b'The Matrix'})
+                raise ValueError()
+        self.assertEqual(list(self.table.scan()), [])
+
+        # Non-transactional batches are still sent
+        with self.assertRaises(ValueError):
+            with self.table.batch() as batch:
+                batch.put(b'matrix', {b'd:title': b'The Matrix'})
+                raise ValueError()
+        self.assertEqual(len(list(self.table.scan())), 1)
+
+    def test_transaction_rollback(self):
+        self.table.put(b'matrix', {b'd:title': b'The Matrix'}, timestamp=1)
+
+        put = self.table._put
+
+        def failing_put(row, data, timestamp):
+            if row == b'inception':
+                raise RuntimeError()
+            put(row, data, timestamp)
+        self.table._put = failing_put
+
+        batch = self.table.batch(transaction=True)
+        batch.put(b'matrix', {b'd:title': b'Matrix', b'd:year': b'1999'})
+        batch.put(b'godfather', {b'd:title': b'The Godfather'})
+        batch.put(b'inception', {b'd:title': b'Inception'})
+        with self.assertRaises(RuntimeError):
+            batch.send()
+
+        # Nothing is applied
+        del self.table._put
+        self.assertEqual(list(self.table.scan(include_timestamp=True)), [
+            (b'matrix', {b'd:title': (b'The Matrix', 1)})
+        ])
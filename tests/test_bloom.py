@@ -0,0 +1,111 @@
+from six.moves import xrange
+
+from .base import BaseTestCase
+from happybase_mock import Connection
+from happybase_mock.bloom import BloomFilter
+
+
+class TestBloomFilter(BaseTestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1024, 7)
+        keys = [b'row%d' % i for i in xrange(100)]
+        for key in keys:
+            bloom.add(key)
+        bloom.add(keys[0])
+        # Keys whose bits are all set already aren't counted
+        self.assertLessEqual(bloom.count, 100)
+        self.assertGreater(bloom.count, 95)
+        self.assertTrue(all(key in bloom for key in keys))
+        misses = sum(b'other%d' % i in bloom for i in xrange(1000))
+        self.assertLess(misses, 50)
+
+
+class TestTableBloomFilters(BaseTestCase):
+
+    def setUp(self):
+        self.conn = Connection()
+        self.conn.create_table('movie', {
+            'd': {'bloom_filter_type': 'ROW'},
+            'x': {'bloom_filter_type': 'ROWCOL',
+                  'bloom_filter_vector_size': 4096,
+                  'bloom_filter_nb_hashes': 3},
+            'n': {},
+        })
+        self.table = self.conn.table('movie')
+        for i in xrange(20):
+            self.table.put(b'%02d' % i, {b'd:title': b'Movie %d' % i,
+                                         b'x:rating': b'8'})
+
+        # Counts the rows read from the storage once the filters are built
+        self.table._blooms._build(self.table._storage)
+        self.reads = []
+        storage = self.table._storage
+        get_row = storage.get_row
+        storage.get_row = lambda row: self.reads.append(row) or get_row(row)
+
+    def test_row(self):
+        self.assertEqual(self.table.row(b'99', columns=[b'd']), {})
+        self.assertEqual(self.table.row(b'05', columns=[b'x:rating']),
+                         {b'x:rating': b'8'})
+        self.assertEqual(self.table.row(b'05', columns=[b'x:other']), {})
+        self.assertEqual(self.reads, [b'05'])
+
+        # Filters don't help with families that don't have one, and ROWCOL
+        # filters with whole families
+        self.table.row(b'99')
+        self.table.row(b'99', columns=[b'x'])
+        self.table.row(b'99', columns=[b'd:title', b'n:views'])
+        self.assertEqual(self.reads, [b'05', b'99', b'99', b'99'])
+
+        stats = self.table.bloom_filter_stats()
+        self.assertEqual(stats['d']['lookups'], 1)
+        self.assertEqual(stats['d']['negatives'], 1)
+        self.assertEqual(stats['x']['lookups'], 2)
+        self.assertEqual(stats['x']['negatives'], 1)
+        self.assertEqual(stats['x']['keys'], 20)
+        self.assertNotIn('n', stats)
+
+    def test_rows_and_counters(self):
+        self.table.counter_inc(b'05', b'x:views')
+        del self.reads[:]
+        rows = self.table.rows([b'05', b'98', b'99'], columns=[b'd:title'])
+        self.assertEqual(rows, [(b'05', {b'd:title': b'Movie 5'}),
+                                (b'98', {}), (b'99', {})])
+        self.assertEqual(self.table.counter_get(b'05', b'x:views'), 1)
+        self.assertEqual(self.table.counter_get(b'06', b'x:views'), 0)
+        self.assertEqual(self.reads, [b'05', b'05'])
+
+    def test_false_positives(self):
+        # Deleted rows stay in the filters until a compaction
+        self.table.delete(b'05')
+        self.assertEqual(self.table.row(b'05', columns=[b'd']), {})
+        self.assertEqual(self.reads, [b'05'])
+        stats = self.table.bloom_filter_stats()['d']
+        self.assertEqual(stats['false_positives'], 1)
+        self.assertEqual(stats['false_positive_rate'], 1.0)
+
+        self.conn.compact_table('movie')
+        self.assertEqual(self.table.row(b'05', columns=[b'd']), {})
+        stats = self.table.bloom_filter_stats()['d']
+        self.assertEqual(stats['negatives'], 1)
+        self.assertEqual(stats['false_positive_rate'], 0.5)
+
+    def test_filters_grow(self):
+        self.table.row(b'00', columns=[b'd'])
+        bits = self.table._blooms._families[b'd'].filter.bits
+        for i in xrange(1000):
+            self.table.put(b'new%d' % i, {b'd:title': b'New'})
+            self.assertEqual(self.table.row(b'new%d' % i, columns=[b'd']),
+                             {b'd:title': b'New'})
+        self.assertGreater(self.table._blooms._families[b'd'].filter.bits,
+                           bits)
+
+    def test_restore(self):
+        checkpoint = self.table.checkpoint()
+        self.table.row(b'00', columns=[b'd'])
+        self.table.put(b'new', {b'd:title': b'New'})
+        self.table.restore(checkpoint)
+        self.assertEqual(self.table.row(b'new', columns=[b'd']), {})
+        self.assertEqual(self.table.row(b'00', columns=[b'd']),
+                         {b'd:title': b'Movie 0'})
@@ -0,0 +1,103 @@
+import unittest
+
+from happybase_mock.cell import Cell, CompactCell
+
+
+class TestCell(unittest.TestCase):
+    cell_class = Cell
+
+    def setUp(self):
+        self.cell = self.cell_class()
+        for ts in (2, 5, 1, 4):
+            self.cell.put(ts, str(ts).encode('utf-8'), max_versions=10)
+
+    def test_latest(self):
+        self.assertEqual(self.cell.latest(), (b'5', 5))
+        self.assertEqual(self.cell.get(), (b'5', 5))
+
+    def test_get_older_than_timestamp(self):
+        self.assertEqual(self.cell.get(5), (b'4', 4))
+        self.assertEqual(self.cell.get(3), (b'2', 2))
+        self.assertIsNone(self.cell.get(1))
+
+    def test_versions(self):
+        self.assertEqual([ts for _, ts in self.cell.versions()],
+                         [5, 4, 2, 1])
+        self.assertEqual([ts for _, ts in self.cell.versions(4)], [2, 1])
+
+    def test_overwrite_same_timestamp(self):
+        self.cell.put(4, b'four', max_versions=10)
+        self.assertEqual(len(self.cell), 4)
+        self.assertEqual(self.cell.get(5), (b'four', 4))
+
+    def test_evict_oldest(self):
+        self.cell.put(3, b'3', max_versions=4)
+        self.assertEqual([ts for _, ts in self.cell.versions()],
+                         [5, 4, 3, 2])
+
+    def test_delete(self):
+        self.cell.delete(4)
+        self.assertEqual(list(self.cell.versions()), [(b'5', 5)])
+        self.cell.delete(5)
+        self.assertEqual(len(self.cell), 0)
+
+    def test_counter(self):
+        cell = self.cell_class()
+        self.assertEqual(cell.counter(), 0)
+        cell.set_counter(1, 20)
+        self.assertEqual(cell.counter(), 20)
+        self.assertEqual(cell.latest(),
+                         (b'\x00\x00\x00\x00\x00\x00\x00\x14', 1))
+
+        # Values written as bytes can be used as counters too
+        self.cell.put(6, b'\x00\x00\x00\x00\x00\x00\x00\x02',
+                      max_versions=10)
+        self.assertEqual(self.cell.counter(), 2)
+
+    def test_copy(self):
+        copy = self.cell.copy()
+        copy.put(6, b'6', max_versions=10)
+        copy.delete(2)
+        self.assertEqual([ts for _, ts in self.cell.versions()],
+                         [5, 4, 2, 1])
+        self.assertEqual([ts for _, ts in copy.versions()], [6, 5, 4])
+
+    def test_from_versions(self):
+        cell = self.cell_class.from_versions([3, 1], [b'3', b'1'])
+        self.assertEqual(list(cell.versions()), [(b'3', 3), (b'1', 1)])
+        cell = self.cell_class.from_versions([3], [b'3'])
+        self.assertEqual(list(cell.versions()), [(b'3', 3)])
+
+    def test_trim(self):
+        self.cell.trim(1)
+        self.assertEqual(list(self.cell.versions()), [(b'5', 5)])
+        self.cell.trim(0)
+        self.assertEqual(len(self.cell), 0)
+
+
+class TestCompactCell(TestCell):
+    cell_class = CompactCell
+
+    def test_single_version(self):
+        cell = CompactCell()
+        self.assertEqual(len(cell), 0)
+        self.assertEqual(cell.counter(), 0)
+        cell.put(1, b'1', max_versions=1)
+        cell.put(1, b'one', max_versions=1)
+        self.assertEqual(cell._keys, -1)
+        self.assertEqual(cell._values, b'one')
+
+        # Goes back to a single version once older ones are evicted
+        cell.put(2, b'2', max_versions=1)
+        self.assertEqual(cell._keys, -2)
+        self.assertEqual(cell.get(3), (b'2', 2))
+        self.assertIsNone(cell.get(2))
+
+        cell.put(3, b'3', max_versions=2)
+        self.assertEqual(list(cell._keys), [-3, -2])
+        cell.delete(2)
+        self.assertEqual(cell._keys, -3)
+        cell.delete(3)
+        self.assertIsNone(cell._keys)
+        cell.delete(3)
+        self.assertEqual(len(cell), 0)
@@ -1,5 +1,8 @@
+import time
+
 from .base import BaseTestCase
 from happybase_mock import Connection
+from happybase_mock.lock import _LockContext
 
 
 class TestConnectionSingleton(BaseTestCase):
@@ -168,5 +171,76 @@ class TestConnection(BaseTestCase):
         self.conn.close()
 
     def test_compact(self):
-        # TODO: compact_table() doesn't really do anything
+        # Compacting a non-existing table does nothing
         self.conn.compact_table('no_such_table')
+
+        self.conn.create_table('session', {'s': {'time_to_live': 60}})
+        table = self.conn.table('session')
+        old = int(time.time() * 1000) - 120 * 1000
+        table.put(b'1', {b's:user': b'old'}, timestamp=old - 1)
+        table.put(b'1', {b's:user': b'older'}, timestamp=old)
+        table.put(b'2', {b's:user': b'new'})
+        self.assertEqual(table._storage._keys, [b'1', b'2'])
+
+        self.conn.compact_table('session', major=True)
+        self.assertEqual(table._storage._keys, [b'2'])
+        self.assertEqual(list(table._storage._data), [b'2'])
+
+    def test_compact_in_batches(self):
+        self.conn.create_table('session', {'s': {'time_to_live': 60}})
+        table = self.conn.table('session')
+        old = int(time.time() * 1000) - 120 * 1000
+        for i in range(5):
+            table.put(b'%d' % i, {b's:user': b'user'},
+                      timestamp=old if i % 2 else None)
+
+        # The write lock is only held while a batch of rows is compacted
+        events = []
+        lock = table._lock
+        key_range = table._storage.key_range
+        table._lock.write = _LockContext(
+            lambda: events.append('lock') or lock.acquire_write(),
+            lambda: events.append('unlock') or lock.release_write())
+        table._storage.key_range = lambda *args: (
+            events.append(key_range(*args)) or events[-1])
+        table._compact(batch_size=2)
+        self.assertEqual(events, [
+            'lock', [b'0', b'1'], 'unlock',
+            'lock', [b'2', b'3'], 'unlock',
+            'lock', [b'4'], 'unlock',
+        ])
+        self.assertEqual(table._storage._keys, [b'0', b'2', b'4'])
+
+    def test_background_compaction(self):
+        self.conn.create_table('session', {'s': {'time_to_live': 60}})
+        table = self.conn.table('session')
+        old = int(time.time() * 1000) - 120 * 1000
+        table.put(b'1', {b's:user': b'old'}, timestamp=old)
+
+        self.conn.start_compaction(interval=0.01)
+        try:
+            for _ in range(100):
+                if not table._storage._keys:
+                    break
+                time.sleep(0.01)
+        finally:
+            self.conn.stop_compaction()
+        self.assertEqual(table._storage._keys, [])
+        self.assertIsNone(self.conn._compaction)
+
+    def test_checkpoint(self):
+        self.conn.create_table('movie', {'d': {}})
+        self.conn.create_table('person', {'d': {}})
+        self.conn.table('movie').put(b'matrix', {b'd:title': b'The Matrix'})
+        checkpoint = self.conn.checkpoint()
+
+        self.conn.table('movie').delete(b'matrix')
+        self.conn.delete_table('person', disable=True)
+        self.conn.create_table('book', {'d': {}})
+        self.conn.disable_table('movie')
+
+        self.conn.restore(checkpoint)
+        self.assertEqual(self.conn.tables(), ['movie', 'person'])
+        self.assertTrue(self.conn.is_table_enabled('movie'))
+        self.assertEqual(self.conn.table('movie').row(b'matrix'),
+                         {b'd:title': b'The Matrix'})
@@ -0,0 +1,163 @@
+from .base import BaseTestCase
+from happybase_mock import Connection
+from happybase_mock.filters import compile_filter
+
+
+class TestFilters(BaseTestCase):
+
+    def setUp(self):
+        self.conn = Connection()
+        self.conn.create_table('movie', {'d': dict(), 'm': dict()})
+        self.table = self.conn.table('movie')
+        self.table.put(b'frozen', {
+            b'd:title': b'Frozen', b'd:year': b'2013', b'm:rating': b'7.4'
+        }, timestamp=10)
+        self.table.put(b'godfather', {
+            b'd:title': b'The Godfather', b'd:year': b'1972'
+        }, timestamp=20)
+        self.table.put(b'goodfellas', {
+            b'd:title': b'Goodfellas', b'd:year': b'1990',
+            b'm:rating': b'8.7'
+        }, timestamp=30)
+        self.table.put(b'matrix', {
+            b'd:title': b'The Matrix', b'd:year': b'1999'
+        }, timestamp=40)
+
+    def scan(self, filter, **kwargs):
+        return list(self.table.scan(filter=filter, **kwargs))
+
+    def keys(self, filter, **kwargs):
+        return [key for key, _ in self.scan(filter, **kwargs)]
+
+    def test_prefix_filter(self):
+        self.assertEqual(self.keys("PrefixFilter('go')"),
+                         [b'godfather', b'goodfellas'])
+        self.assertEqual(self.keys(b"PrefixFilter('go')", row_start=b'goo'),
+                         [b'goodfellas'])
+        self.assertEqual(self.keys("PrefixFilter('')"),
+                         [b'frozen', b'godfather', b'goodfellas', b'matrix'])
+
+    def test_key_only_filter(self):
+        self.assertEqual(self.scan("KeyOnlyFilter()", row_prefix=b'm'), [
+            (b'matrix', {b'd:title': b'', b'd:year': b''})
+        ])
+
+    def test_first_key_only_filter(self):
+        self.assertEqual(
+            self.scan("FirstKeyOnlyFilter()", include_timestamp=True), [
+                (b'frozen', {b'd:title': (b'Frozen', 10)}),
+                (b'godfather', {b'd:title': (b'The Godfather', 20)}),
+                (b'goodfellas', {b'd:title': (b'Goodfellas', 30)}),
+                (b'matrix', {b'd:title': (b'The Matrix', 40)}),
+            ])
+
+    def test_column_prefix_filter(self):
+        self.assertEqual(self.scan("ColumnPrefixFilter('rat')"), [
+            (b'frozen', {b'm:rating': b'7.4'}),
+            (b'goodfellas', {b'm:rating': b'8.7'}),
+        ])
+        self.assertEqual(
+            self.keys("MultipleColumnPrefixFilter('rat', 'ye')"),
+            [b'frozen', b'godfather', b'goodfellas', b'matrix'])
+
+    def test_page_filter(self):
+        self.assertEqual(self.keys("PageFilter(2)"),
+                         [b'frozen', b'godfather'])
+        # Every scan gets a fresh page
+        self.assertEqual(self.keys("PageFilter(2)", batch_size=1),
+                         [b'frozen', b'godfather'])
+        self.assertEqual(
+            self.keys("PageFilter(1) AND ColumnPrefixFilter('rat')",
+                      row_start=b'g'),
+            [b'goodfellas'])
+
+    def test_single_column_value_filter(self):
+        self.assertEqual(
+            self.keys("SingleColumnValueFilter('d', 'year', <, "
+                      "'binary:1995')"),
+            [b'godfather', b'goodfellas'])
+
+        # Rows without the column are included unless filterIfMissing
+        self.assertEqual(
+            self.keys("SingleColumnValueFilter('m', 'rating', >=, "
+                      "'binary:8')"),
+            [b'godfather', b'goodfellas', b'matrix'])
+        self.assertEqual(
+            self.keys("SingleColumnValueFilter('m', 'rating', >=, "
+                      "'binary:8', true, true)"),
+            [b'goodfellas'])
+
+        self.assertEqual(
+            self.scan("SingleColumnValueExcludeFilter('d', 'title', =, "
+                      "'substring:MATRIX')"),
+            [(b'matrix', {b'd:year': b'1999'})])
+
+    def test_compare_filters(self):
+        self.assertEqual(self.keys("RowFilter(>, 'binary:goodfellas')"),
+                         [b'matrix'])
+        self.assertEqual(self.keys("RowFilter(=, 'regexstring:^go+d')"),
+                         [b'godfather', b'goodfellas'])
+        self.assertEqual(self.scan("FamilyFilter(=, 'binary:m')"), [
+            (b'frozen', {b'm:rating': b'7.4'}),
+            (b'goodfellas', {b'm:rating': b'8.7'}),
+        ])
+        self.assertEqual(
+            self.scan("QualifierFilter(=, 'binaryprefix:ti') AND "
+                      "ValueFilter(!=, 'substring:the')"),
+            [(b'frozen', {b'd:title': b'Frozen'}),
+             (b'goodfellas', {b'd:title': b'Goodfellas'})])
+
+    def test_column_filters(self):
+        self.assertEqual(
+            self.scan("ColumnRangeFilter('rating', true, 'title', false)",
+                      row_prefix=b'frozen'),
+            [(b'frozen', {b'm:rating': b'7.4'})])
+        self.assertEqual(
+            self.scan("ColumnCountGetFilter(1)", row_prefix=b'm'),
+            [(b'matrix', {b'd:title': b'The Matrix'})])
+        self.assertEqual(
+            self.scan("ColumnPaginationFilter(1, 1)", row_prefix=b'm'),
+            [(b'matrix', {b'd:year': b'1999'})])
+
+    def test_inclusive_stop_filter(self):
+        self.assertEqual(self.keys("InclusiveStopFilter('goodfellas')"),
+                         [b'frozen', b'godfather', b'goodfellas'])
+        self.assertEqual(
+            self.keys("InclusiveStopFilter('godfather')", reverse=True),
+            [b'matrix', b'goodfellas', b'godfather'])
+
+    def test_or_filter(self):
+        self.assertEqual(
+            self.keys("PrefixFilter('f') OR RowFilter(=, 'binary:matrix')"),
+            [b'frozen', b'matrix'])
+
+    def test_skip_and_while(self):
+        self.assertEqual(
+            self.keys("SKIP ValueFilter(!=, 'binary:1972')"),
+            [b'frozen', b'goodfellas', b'matrix'])
+        self.assertEqual(
+            self.keys("WHILE RowFilter(<, 'binary:goodfellas')"),
+            [b'frozen', b'godfather'])
+        self.assertEqual(
+            self.keys("(WHILE RowFilter(<, 'binary:h')) AND "
+                      "ColumnPrefixFilter('rat')"),
+            [b'frozen', b'goodfellas'])
+
+    def test_quoted_strings(self):
+        self.table.put(b"it's", {b'd:title': b"It's a Wonderful Life"})
+        self.assertEqual(self.keys("PrefixFilter('it''s')"), [b"it's"])
+
+    def test_invalid_filters(self):
+        for filter in ("NoSuchFilter()", "PrefixFilter(", "PrefixFilter(1)",
+                       "PageFilter('a')", "RowFilter(<, 'substring:a')",
+                       "PrefixFilter('a') AND", "PrefixFilter('a') x",
+                       "KeyOnlyFilter() $"):
+            with self.assertRaises(IOError):
+                self.table.scan(filter=filter)
+
+    def test_compiled_filter_is_cached(self):
+        compile_filter("KeyOnlyFilter()")
+        self.assertIs(compile_filter("KeyOnlyFilter()"),
+                      compile_filter("KeyOnlyFilter()"))
+        self.assertIsNot(compile_filter("PageFilter(1)"),
+                         compile_filter("PageFilter(1)"))
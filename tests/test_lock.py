@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+
+from happybase_mock.lock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def test_shared_readers(self):
+        with self.lock.read:
+            acquired = []
+            thread = threading.Thread(
+                target=lambda: self._acquire(self.lock.read, acquired))
+            thread.start()
+            thread.join(1)
+            self.assertEqual(acquired, [True])
+
+    def test_exclusive_writer(self):
+        acquired = []
+        with self.lock.write:
+            thread = threading.Thread(
+                target=lambda: self._acquire(self.lock.read, acquired))
+            thread.start()
+            time.sleep(0.05)
+            self.assertEqual(acquired, [])
+        thread.join(1)
+        self.assertEqual(acquired, [True])
+
+    def test_writer_waits_for_readers(self):
+        acquired = []
+        with self.lock.read:
+            thread = threading.Thread(
+                target=lambda: self._acquire(self.lock.write, acquired))
+            thread.start()
+            time.sleep(0.05)
+            self.assertEqual(acquired, [])
+        thread.join(1)
+        self.assertEqual(acquired, [True])
+
+    def test_reentrant_writer(self):
+        with self.lock.write:
+            with self.lock.write:
+                with self.lock.read:
+                    pass
+        # Released completely
+        with self.lock.read:
+            pass
+        self.assertIsNone(self.lock._writer)
+
+    def _acquire(self, context, acquired):
+        with context:
+            acquired.append(True)
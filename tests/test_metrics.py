@@ -0,0 +1,89 @@
+from .base import BaseTestCase
+from happybase_mock import Connection
+
+
+class TestMetrics(BaseTestCase):
+
+    def setUp(self):
+        self.conn = Connection()
+        self.conn.create_table('person', {'d': dict()})
+        self.table = self.conn.table('person')
+        self.events = []
+        self.metrics = self.conn.enable_metrics(self.events.append)
+
+    def test_disabled_by_default(self):
+        self.conn.disable_metrics()
+        self.table.put(b'1', {b'd:name': b'John'})
+        self.assertEqual(self.metrics.stats(), {})
+
+    def test_reads_and_writes(self):
+        self.table.put(b'1', {b'd:name': b'John', b'd:age': b'42'})
+        self.table.row(b'1')
+        self.table.row(b'1', columns=[b'd:age'], include_timestamp=True)
+        self.table.delete(b'1', columns=[b'd:age'])
+
+        stats = self.metrics.stats('person')
+        self.assertEqual(stats['put']['calls'], 1)
+        self.assertEqual(stats['put']['cells_written'], 2)
+        self.assertEqual(stats['put']['bytes_written'], 17)
+        self.assertEqual(stats['row']['calls'], 2)
+        self.assertEqual(stats['row']['cells_read'], 3)
+        self.assertEqual(stats['row']['bytes_read'], 24)
+        self.assertEqual(stats['delete']['cells_written'], 1)
+        self.assertGreater(stats['row']['time'], 0)
+        self.assertEqual(stats['row']['errors'], 0)
+
+    def test_nested_calls(self):
+        # rows() is a single call, whatever it does internally
+        self.table.put(b'1', {b'd:name': b'John'})
+        self.table.rows([b'1', b'2'])
+        stats = self.metrics.stats()
+        self.assertEqual(stats['rows']['calls'], 1)
+        self.assertEqual(stats['rows']['cells_read'], 1)
+        self.assertNotIn('row', stats)
+
+    def test_scan(self):
+        for i in range(5):
+            self.table.put(str(i), {b'd:v': b'x'})
+        scanner = self.table.scan(batch_size=2)
+        self.assertNotIn('scan', self.metrics.stats())
+
+        next(scanner)
+        next(scanner)
+        scanner.close()
+        self.assertEqual(self.metrics.stats()['scan']['cells_read'], 2)
+
+        list(self.table.scan())
+        stats = self.metrics.stats()['scan']
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['cells_read'], 7)
+        self.assertEqual(stats['bytes_read'], 7 * 5)
+
+    def test_batch_and_counters(self):
+        with self.table.batch() as b:
+            b.put(b'1', {b'd:name': b'John'})
+            b.put(b'2', {b'd:name': b'Jane'})
+            b.delete(b'3')
+        self.table.counter_inc(b'1', b'd:hits')
+        self.table.counter_get(b'1', b'd:hits')
+
+        stats = self.metrics.stats()
+        self.assertEqual(stats['batch']['calls'], 1)
+        self.assertEqual(stats['batch']['cells_written'], 2)
+        self.assertEqual(stats['counter_inc']['cells_written'], 1)
+        self.assertEqual(stats['counter_get']['cells_read'], 1)
+
+    def test_errors_and_tracer(self):
+        with self.assertRaises(IOError):
+            self.table.put(b'1', {b'x:name': b'John'})
+        self.conn.create_table('other', {'d': dict()})
+        self.conn.table('other').row(b'1')
+
+        self.assertEqual([(e.table, e.method) for e in self.events], [
+            ('person', 'put'), (None, 'create_table'), ('other', 'row')])
+        self.assertIsInstance(self.events[0].error, IOError)
+        self.assertEqual(self.metrics.stats('person')['put']['errors'], 1)
+        self.assertEqual(list(self.metrics.stats('other')), ['row'])
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.stats(), {})
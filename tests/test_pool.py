@@ -1,5 +1,8 @@
+import threading
+
 from .base import BaseTestCase
-from happybase_mock.pool import Connection, ConnectionPool
+from happybase_mock.pool import (
+    Connection, ConnectionPool, NoConnectionsAvailable)
 
 
 class TestConnectionPool(BaseTestCase):
@@ -19,3 +22,76 @@ class TestConnectionPool(BaseTestCase):
             table = conn.table('hello')
             table.put(b'key', {b'd:data': b'world'})
             self.assertEqual(table.row(b'key'), {b'd:data': b'world'})
+
+    def test_invalid_size(self):
+        with self.assertRaises(TypeError):
+            ConnectionPool('5')
+        with self.assertRaises(ValueError):
+            ConnectionPool(0)
+
+    def test_connections_share_tables(self):
+        pool = ConnectionPool(2)
+        with pool.connection() as conn:
+            conn.create_table('hello', {'d': dict()})
+
+        results = []
+
+        def work():
+            with pool.connection() as conn:
+                results.append(conn.tables())
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [['hello']])
+
+    def test_nested_connection(self):
+        pool = ConnectionPool(1)
+        with pool.connection() as conn1:
+            # The same thread gets its connection back instead of waiting
+            with pool.connection(timeout=0.01) as conn2:
+                self.assertIs(conn1, conn2)
+        self.assertEqual(pool.stats()['checkouts'], 1)
+
+    def test_timeout(self):
+        pool = ConnectionPool(1)
+        errors = []
+
+        def work():
+            try:
+                with pool.connection(timeout=0.01):
+                    pass
+            except NoConnectionsAvailable as e:
+                errors.append(e)
+
+        with pool.connection():
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(errors), 1)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreater(stats['wait_time'], 0)
+        self.assertEqual(stats['available'], 1)
+
+    def test_wait_for_connection(self):
+        pool = ConnectionPool(1)
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def work():
+            with pool.connection():
+                acquired.set()
+                release.wait(1)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        acquired.wait(1)
+        release.set()
+        with pool.connection(timeout=1):
+            pass
+        thread.join()
+        self.assertEqual(pool.stats()['checkouts'], 2)
@@ -0,0 +1,91 @@
+import unittest
+
+from .base import BaseTestCase
+from happybase_mock import Connection
+
+try:
+    import happybase
+    from happybase_mock.server import ThriftServer
+except ImportError:
+    happybase = None
+
+
+@unittest.skipIf(happybase is None, 'needs happybase and thriftpy2')
+class TestThriftServer(BaseTestCase):
+
+    def setUp(self):
+        self.server = ThriftServer('127.0.0.1', 0)
+        self.server.start()
+        self.client = happybase.Connection('127.0.0.1', self.server.port)
+        self.client.create_table('movie', {'d': {'max_versions': 2}})
+        self.table = self.client.table('movie')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        super(TestThriftServer, self).tearDown()
+
+    def test_tables(self):
+        self.assertEqual(self.client.tables(), [b'movie'])
+        self.assertEqual(self.table.families()[b'd']['max_versions'], 2)
+        self.assertEqual(len(self.table.regions()), 1)
+        with self.assertRaises(Exception) as cm:
+            self.client.create_table('movie', {'d': {}})
+        self.assertEqual(type(cm.exception).__name__, 'AlreadyExists')
+
+        self.client.disable_table('movie')
+        self.assertFalse(self.client.is_table_enabled('movie'))
+        self.client.delete_table('movie')
+        self.assertEqual(self.client.tables(), [])
+
+    def test_reads_and_writes(self):
+        self.table.put(b'matrix', {b'd:title': b'The Matrix'}, timestamp=1)
+        self.table.put(b'matrix', {b'd:title': b'Matrix'}, timestamp=2)
+        with self.table.batch() as b:
+            b.put(b'frozen', {b'd:title': b'Frozen', b'd:year': b'2013'})
+            b.put(b'alien', {b'd:title': b'Alien'})
+            b.delete(b'frozen', [b'd:year'])
+
+        self.assertEqual(self.table.row(b'matrix'), {b'd:title': b'Matrix'})
+        self.assertEqual(self.table.row(b'none'), {})
+        self.assertEqual(self.table.cells(b'matrix', b'd:title',
+                                          include_timestamp=True),
+                         [(b'Matrix', 2), (b'The Matrix', 1)])
+        self.assertEqual(self.table.rows([b'frozen', b'none', b'alien']), [
+            (b'frozen', {b'd:title': b'Frozen'}),
+            (b'alien', {b'd:title': b'Alien'}),
+        ])
+
+        self.assertEqual(self.table.counter_inc(b'matrix', b'd:views', 5), 5)
+        self.assertEqual(self.table.counter_get(b'matrix', b'd:views'), 5)
+
+        # Deleting a whole row deletes all its families
+        self.table.delete(b'alien')
+        self.assertEqual(self.table.row(b'alien'), {})
+
+        # The mock connection with the same host and port sees the data
+        conn = Connection(host='127.0.0.1', port=self.server.port)
+        table = conn.table('movie')
+        self.assertEqual(table.row(b'frozen'), {b'd:title': b'Frozen'})
+
+    def test_scan(self):
+        with self.table.batch() as b:
+            for i in range(10):
+                b.put(b'%02d' % i, {b'd:n': b'%d' % i})
+
+        self.assertEqual([k for k, _ in self.table.scan(batch_size=3)],
+                         [b'%02d' % i for i in range(10)])
+        self.assertEqual(
+            list(self.table.scan(row_start=b'03', row_stop=b'05',
+                                 include_timestamp=True))[0][1][b'd:n'][0],
+            b'3')
+        self.assertEqual([k for k, _ in self.table.scan(row_prefix=b'0',
+                                                        limit=2)],
+                         [b'00', b'01'])
+        self.assertEqual(
+            [k for k, _ in self.table.scan(
+                filter=b"SingleColumnValueFilter('d', 'n', =, 'binary:7')")],
+            [b'07'])
+        self.assertEqual(
+            list(self.table.scan(row_start=b'09', sorted_columns=True)),
+            [(b'09', {b'd:n': b'9'})])
@@ -0,0 +1,73 @@
+from multiprocessing import Process
+
+from .base import BaseTestCase
+from happybase_mock import Connection, shared
+
+
+def _produce(count):
+    # Runs in another process
+    table = Connection().table('movie')
+    with table.batch() as b:
+        for i in range(count):
+            b.put(b'%03d' % i, {b'd:title': b'Movie %d' % i})
+
+
+class TestShared(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = shared.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.conn = Connection()
+        for name in self.conn.tables():
+            self.conn.delete_table(name, disable=True)
+        self.conn.create_table('movie', {'d': {}})
+        self.table = self.conn.table('movie')
+
+    def test_connection(self):
+        self.assertIsInstance(self.conn, shared.RemoteConnection)
+        self.assertIs(Connection(), self.conn)
+        self.assertEqual(self.conn.tables(), ['movie'])
+
+        other = Connection(table_prefix='test')
+        other.create_table('movie', {'d': {}})
+        other.table('movie').put(b'1', {b'd:title': b'Frozen'})
+        self.assertEqual(Connection(table_prefix='test').table('movie').row(
+            b'1'), {b'd:title': b'Frozen'})
+        self.assertEqual(self.table.row(b'1'), {})
+        other.delete_table('movie', disable=True)
+
+    def test_other_process(self):
+        process = Process(target=_produce, args=(25,))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(self.table.row(b'007'), {b'd:title': b'Movie 7'})
+        self.assertEqual([k for k, _ in self.table.scan(batch_size=10)],
+                         [b'%03d' % i for i in range(25)])
+
+    def test_scan_batches(self):
+        _produce(10)
+        scanner = self.table.scan(row_start=b'002', batch_size=3)
+        self.assertEqual(next(scanner), (b'002', {b'd:title': b'Movie 2'}))
+        scanner.close()
+
+        rows = self.table.scan(row_start=b'007', columns=[b'd'],
+                               batch_size=4, reverse=True)
+        self.assertEqual([k for k, _ in rows],
+                         [b'%03d' % i for i in reversed(range(8))])
+        self.assertEqual(list(self.table.scan(row_prefix=b'1')), [])
+
+    def test_errors(self):
+        with self.assertRaises(IOError):
+            self.table.put(b'1', {b'x:title': b'Frozen'})
+        with self.assertRaises(TypeError):
+            self.table.scan(row_prefix=b'1', row_start=b'1')
+        self.table.counter_inc(b'1', b'd:views', 2)
+        self.assertEqual(self.table.counter_get(b'1', b'd:views'), 2)
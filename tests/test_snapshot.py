@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+
+from .base import BaseTestCase
+from happybase_mock import Connection
+from happybase_mock.cell import CompactCell
+
+
+class TestSnapshot(BaseTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'fixture.hbm')
+
+        self.conn = Connection(table_prefix='app')
+        self.conn.create_table('movie', {'d': {'max_versions': 5}, 'm': {}})
+        self.conn.create_table('empty', {'d': {}})
+        self.conn.disable_table('empty')
+        self.table = self.conn.table('movie')
+        self.table.put(b'matrix', {b'd:title': b'Matrix'}, timestamp=1)
+        self.table.put(b'matrix', {b'd:title': b'The Matrix'}, timestamp=2)
+        self.table.put(b'frozen', {b'd:title': b'Frozen', b'm:': b''})
+        self.table.counter_set(b'frozen', b'm:views', 42)
+
+    def tearDown(self):
+        super(TestSnapshot, self).tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def _reload(self):
+        self.conn.save(self.path)
+        Connection._instances.clear()
+        conn = Connection(table_prefix='app')
+        conn.load(self.path)
+        return conn
+
+    def test_save_and_load(self):
+        conn = self._reload()
+        self.assertEqual(conn.tables(), ['empty', 'movie'])
+        self.assertFalse(conn.is_table_enabled('empty'))
+
+        table = conn.table('movie')
+        self.assertEqual(table.families()['d']['max_versions'], 5)
+        self.assertEqual(table.cells(b'matrix', b'd:title',
+                                     include_timestamp=True),
+                         [(b'The Matrix', 2), (b'Matrix', 1)])
+        self.assertEqual(list(table.scan(columns=[b'd:title'])), [
+            (b'frozen', {b'd:title': b'Frozen'}),
+            (b'matrix', {b'd:title': b'The Matrix'}),
+        ])
+        self.assertEqual(table.row(b'frozen')[b'm:'], b'')
+        self.assertEqual(table.counter_inc(b'frozen', b'm:views'), 43)
+
+    def test_rows_are_decoded_lazily(self):
+        table = self._reload().table('movie')
+        self.assertEqual(sorted(table._storage._pending),
+                         [b'frozen', b'matrix'])
+        self.assertEqual(table._storage._data, {})
+
+        table.row(b'matrix')
+        self.assertEqual(list(table._storage._pending), [b'frozen'])
+
+        # Writes and deletes work on rows that aren't decoded yet
+        mapping = table._storage._mapping
+        table.delete(b'frozen')
+        table.put(b'alien', {b'd:title': b'Alien'})
+        self.assertEqual(table._storage._pending, {})
+        self.assertIsNone(table._storage._snapshot)
+        # The other tables of the file have no rows, it's not needed anymore
+        self.assertTrue(mapping.buf.closed)
+        self.assertEqual([k for k, _ in table.scan()], [b'alien', b'matrix'])
+
+    def test_save_loaded_connection(self):
+        conn = self._reload()
+
+        # Undecoded rows are copied over from the loaded snapshot
+        conn.table('movie').put(b'alien', {b'd:title': b'Alien'})
+        conn.save(self.path)
+        Connection._instances.clear()
+        conn = Connection(table_prefix='app')
+        conn.load(self.path)
+
+        table = conn.table('movie')
+        self.assertEqual([k for k, _ in table.scan()],
+                         [b'alien', b'frozen', b'matrix'])
+        self.assertEqual(table.row(b'matrix'), {b'd:title': b'The Matrix'})
+
+    def test_compact_table(self):
+        self.conn.create_table('compact', {'d': {}}, compact=True)
+        self.conn.table('compact').put(b'1', {b'd:a': b'1'})
+
+        table = self._reload().table('compact')
+        self.assertTrue(table._storage.compact)
+        self.assertEqual(table.row(b'1'), {b'd:a': b'1'})
+        self.assertIsInstance(table._storage._data[b'1'][b'd:a'], CompactCell)
+
+    def test_load_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot')
+        with self.assertRaises(IOError):
+            self.conn.load(self.path)
+
+        # Empty and truncated files
+        open(self.path, 'wb').close()
+        with self.assertRaises(IOError):
+            self.conn.load(self.path)
+        self.conn.save(self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for size in (8, 20, len(data) - 1):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            with self.assertRaises(IOError):
+                self.conn.load(self.path)
+        self.assertEqual(self.conn.table('movie').row(b'matrix'),
+                         {b'd:title': b'The Matrix'})
+
+    def test_close_loaded_storage(self):
+        conn = self._reload()
+        storage = conn.table('movie')._storage
+        mapping = storage._mapping
+        storage.close()
+        self.assertEqual(storage._pending, {})
+        self.assertTrue(mapping.buf.closed)
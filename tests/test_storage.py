@@ -0,0 +1,252 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from .base import BaseTestCase
+from happybase_mock import Connection, MemoryStorage, SqliteStorage
+from happybase_mock.cell import Cell
+
+
+class TestMemoryStorage(BaseTestCase):
+
+    def setUp(self):
+        self.storage = MemoryStorage()
+
+    def _put(self, row, value):
+        cell = Cell()
+        cell.put(1, value, 3)
+        self.storage.put_row(row, {b'd:v': cell})
+
+    def test_rows(self):
+        self.assertIsNone(self.storage.get_row(b'1'))
+        self._put(b'2', b'two')
+        self._put(b'1', b'one')
+        self._put(b'2', b'deux')
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get_row(b'2')[b'd:v'].latest(),
+                         (b'deux', 1))
+
+        self.storage.delete_row(b'2')
+        self.storage.delete_row(b'3')
+        self.assertIsNone(self.storage.get_row(b'2'))
+        self.assertEqual(list(self.storage.keys()), [b'1'])
+
+    def test_key_range(self):
+        for row in (b'd', b'a', b'c', b'b'):
+            self._put(row, row)
+        self.assertEqual(self.storage.key_range(b'b'), [b'b', b'c', b'd'])
+        self.assertEqual(self.storage.key_range(b'', b'c'), [b'a', b'b'])
+        self.assertEqual(self.storage.key_range(b'a', b'd', 2),
+                         [b'a', b'b'])
+        self.assertEqual(self.storage.key_range(b'a', b'd', 2, True),
+                         [b'c', b'b'])
+        self.assertEqual(list(self.storage.keys(batch_size=1)),
+                         [b'a', b'b', b'c', b'd'])
+
+
+class TestSqliteStorage(TestMemoryStorage):
+    # Runs the tests above against SQLite, plus the ones below
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'hbase.db')
+        self.storage = SqliteStorage(self.path)
+
+    def tearDown(self):
+        super(TestSqliteStorage, self).tearDown()
+        self.storage.close()
+        shutil.rmtree(self.dir)
+
+    def test_write_ahead_log(self):
+        mode, = self.storage._db.execute('PRAGMA journal_mode').fetchone()
+        self.assertEqual(mode, 'wal')
+
+    def test_table_outlives_connection(self):
+        conn = Connection()
+        conn.create_table('movie', {'d': {}}, storage=self.storage)
+        table = conn.table('movie')
+        table.put(b'matrix', {b'd:title': b'The Matrix'}, timestamp=1)
+        with table.batch() as b:
+            b.put(b'frozen', {b'd:title': b'Frozen'})
+            b.put(b'alien', {b'd:title': b'Alien'})
+        table.counter_inc(b'matrix', b'd:views')
+
+        # Another storage on the same file sees the rows
+        Connection._instances.clear()
+        conn = Connection()
+        conn.create_table('movie', {'d': {}},
+                          storage=SqliteStorage(self.path))
+        table = conn.table('movie')
+        self.assertEqual([k for k, _ in table.scan()],
+                         [b'alien', b'frozen', b'matrix'])
+        self.assertEqual(table.cells(b'matrix', b'd:title',
+                                     include_timestamp=True),
+                         [(b'The Matrix', 1)])
+        self.assertEqual(table.counter_get(b'matrix', b'd:views'), 1)
+        table._storage.close()
+
+    def test_tables_share_file(self):
+        other = SqliteStorage(self.path, name='other "rows"')
+        self._put(b'1', b'one')
+        self.assertEqual(other.count(), 0)
+        other.close()
+
+    def test_delete_table_drops_rows(self):
+        conn = Connection()
+        conn.create_table('movie', {'d': {}}, storage=self.storage)
+        conn.table('movie').put(b'matrix', {b'd:title': b'The Matrix'})
+        conn.delete_table('movie', disable=True)
+
+        storage = SqliteStorage(self.path)
+        self.assertEqual(storage.count(), 0)
+        storage.close()
+
+    def test_checkpoint(self):
+        self._put(b'a', b'a')
+        self._put(b'b', b'b')
+        checkpoint = self.storage.checkpoint()
+        self._put(b'a', b'A')
+        self._put(b'c', b'c')
+        self.storage.delete_row(b'b')
+        self.assertEqual(checkpoint.key_range(b''), [b'a', b'b'])
+        self.assertEqual(checkpoint.get_row(b'a')[b'd:v'].latest()[0], b'a')
+
+        self.storage.restore(checkpoint)
+        self.assertEqual(self.storage.key_range(b''), [b'a', b'b'])
+        self.assertEqual(self.storage.get_row(b'a')[b'd:v'].latest()[0],
+                         b'a')
+        with self.assertRaises(ValueError):
+            self.storage.restore(MemoryStorage().checkpoint())
+
+        # The copy of the rows is dropped with the checkpoint
+        table = checkpoint._table
+        del checkpoint
+        with self.assertRaises(sqlite3.OperationalError):
+            self.storage._db.execute('SELECT * FROM %s' % table)
+
+    def test_connection_checkpoint(self):
+        conn = Connection()
+        conn.create_table('movie', {'d': {}}, storage=self.storage)
+        table = conn.table('movie')
+        table.put(b'matrix', {b'd:title': b'The Matrix'})
+        checkpoint = conn.checkpoint()
+        table.put(b'matrix', {b'd:title': b'Matrix'})
+        table.put(b'frozen', {b'd:title': b'Frozen'})
+        conn.restore(checkpoint)
+        self.assertEqual(list(table.scan()),
+                         [(b'matrix', {b'd:title': b'The Matrix'})])
+
+    def test_restore_deleted_table(self):
+        conn = Connection()
+        conn.create_table('movie', {'d': {}}, storage=self.storage)
+        table = conn.table('movie')
+        table.put(b'matrix', {b'd:title': b'The Matrix'})
+        checkpoint = conn.checkpoint()
+
+        # Deleting the table drops its rows, restoring it creates them again
+        conn.delete_table('movie', disable=True)
+        conn.restore(checkpoint)
+        self.assertEqual(conn.tables(), ['movie'])
+        self.assertEqual(list(conn.table('movie').scan()),
+                         [(b'matrix', {b'd:title': b'The Matrix'})])
+
+        storage = SqliteStorage(self.path)
+        self.assertEqual(storage.key_range(b''), [b'matrix'])
+        storage.close()
+
+    def test_save_snapshot(self):
+        conn = Connection()
+        conn.create_table('movie', {'d': {}}, storage=self.storage)
+        conn.table('movie').put(b'matrix', {b'd:title': b'The Matrix'})
+
+        path = os.path.join(self.dir, 'snapshot')
+        conn.save(path)
+        Connection._instances.clear()
+        conn = Connection()
+        conn.load(path)
+        self.assertEqual(conn.table('movie').row(b'matrix'),
+                         {b'd:title': b'The Matrix'})
+
+
+class TestMemoryCheckpoints(BaseTestCase):
+
+    def setUp(self):
+        self.storage = MemoryStorage()
+        for row in (b'a', b'b', b'c'):
+            self._put(row, row)
+
+    def _put(self, row, value):
+        data = self.storage.row_for_update(row) or {}
+        self.storage.new_cell(data, b'd:v').put(1, value, 3)
+        self.storage.put_row(row, data)
+
+    def _rows(self, storage):
+        return [(row, storage.get_row(row)[b'd:v'].latest()[0])
+                for row in storage.key_range(b'')]
+
+    def test_nested_checkpoints(self):
+        first = self.storage.checkpoint()
+        self._put(b'a', b'A')
+        self.storage.delete_row(b'b')
+        second = self.storage.checkpoint()
+        self._put(b'a', b'AA')
+        self._put(b'd', b'd')
+        self.storage.delete_row(b'c')
+
+        self.assertEqual(self._rows(first),
+                         [(b'a', b'a'), (b'b', b'b'), (b'c', b'c')])
+        self.assertEqual(self._rows(second), [(b'a', b'A'), (b'c', b'c')])
+        self.assertEqual(self._rows(self.storage),
+                         [(b'a', b'AA'), (b'd', b'd')])
+        self.assertEqual(first.count(), 3)
+        self.assertEqual(first.key_range(b'a', None, 2, True), [b'c', b'b'])
+        self.assertEqual(second.key_range(b'b', b'z', 1), [b'c'])
+
+        # Dropping a checkpoint keeps the older ones intact
+        del second
+        self._put(b'c', b'C')
+        self.assertEqual(len(self.storage._logs), 1)
+        self.assertEqual(self._rows(first),
+                         [(b'a', b'a'), (b'b', b'b'), (b'c', b'c')])
+
+        self.storage.restore(first)
+        self.assertEqual(self._rows(self.storage),
+                         [(b'a', b'a'), (b'b', b'b'), (b'c', b'c')])
+
+    def test_no_copies_without_checkpoints(self):
+        checkpoint = self.storage.checkpoint()
+        data = self.storage.get_row(b'a')
+        self.assertIsNot(self.storage.row_for_update(b'a'), data)
+
+        del checkpoint
+        data = self.storage.row_for_update(b'a')
+        self.assertIs(self.storage.row_for_update(b'a'), data)
+        self.assertIsNone(self.storage._log)
+
+    def test_saved_rows_are_updated_in_place(self):
+        first = self.storage.checkpoint()
+        self._put(b'a', b'A')
+        second = self.storage.checkpoint()
+        self.assertEqual(self._rows(first),
+                         [(b'a', b'a'), (b'b', b'b'), (b'c', b'c')])
+        self.assertEqual(self._rows(second),
+                         [(b'a', b'A'), (b'b', b'b'), (b'c', b'c')])
+        cache = first._cache
+
+        # Rows saved later are added to the saved rows of the checkpoints,
+        # which aren't rebuilt
+        self._put(b'a', b'AA')
+        self.storage.delete_row(b'b')
+        self._put(b'd', b'd')
+        self.assertEqual(self._rows(first),
+                         [(b'a', b'a'), (b'b', b'b'), (b'c', b'c')])
+        self.assertEqual(self._rows(second),
+                         [(b'a', b'A'), (b'b', b'b'), (b'c', b'c')])
+        self.assertIs(first._cache, cache)
+        self.assertEqual(cache[1], [b'a', b'b'])
+        self.assertEqual(cache[2], set([b'd']))
+
+    def test_restore_other_storage(self):
+        with self.assertRaises(ValueError):
+            self.storage.restore(MemoryStorage().checkpoint())
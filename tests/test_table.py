@@ -1,8 +1,9 @@
+import threading
 import time
 from six.moves import xrange
 
 from .base import BaseTestCase
-from happybase_mock import Connection
+from happybase_mock import Connection, Scanner, SqliteStorage
 
 
 class TestTable(BaseTestCase):
@@ -100,6 +101,31 @@ class TestTable(BaseTestCase):
             b'd:email': b'elsa@example.com'
         })
 
+    def test_get_families(self):
+        self.conn.create_table('profile', {'a': {}, 'b': {}, 'c': {}})
+        table = self.conn.table('profile')
+        table.put(b'1', {b'a:x': b'1', b'a:': b'2', b'b:x': b'3',
+                         b'c:x': b'4'})
+        table.put(b'2', {b'b:y': b'5'})
+
+        # A family name selects the whole family, family: only the column
+        # with an empty qualifier
+        self.assertEqual(table.row(b'1', columns=[b'a']),
+                         {b'a:x': b'1', b'a:': b'2'})
+        self.assertEqual(table.row(b'1', columns=[b'a:', 'b', b'x']),
+                         {b'a:': b'2', b'b:x': b'3'})
+        self.assertEqual(table.row(b'1', columns=[b'b', b'b:x', b'c:x']),
+                         {b'b:x': b'3', b'c:x': b'4'})
+        self.assertEqual(
+            table.rows([b'1', b'2'], columns=[b'b']),
+            [(b'1', {b'b:x': b'3'}), (b'2', {b'b:y': b'5'})])
+        self.assertEqual(
+            list(table.scan(columns=[b'c', b'a:x'])),
+            [(b'1', {b'a:x': b'1', b'c:x': b'4'})])
+        self.assertEqual(
+            list(table.scan(columns=[b'b'], filter='KeyOnlyFilter()')),
+            [(b'1', {b'b:x': b''}), (b'2', {b'b:y': b''})])
+
     def test_get_future_timestamp(self):
         future_time = int(time.time() * 1000 * 2)
         self.table.put(b'k', {b'd:a': b'data'}, timestamp=future_time)
@@ -124,6 +150,26 @@ class TestTable(BaseTestCase):
                 (b'02', {b'd:name': (b'Two', 20)})
             ])
 
+    def test_get_multiple_rows_duplicates_and_dict(self):
+        self.table.put(b'01', {b'd:name': b'One', b'd:age': b'1'})
+        self.table.put(b'02', {b'd:name': b'Two'})
+
+        result = self.table.rows(iter(['02', b'01', b'99', b'02']),
+                                 columns=['d:name'])
+        self.assertEqual(result, [
+            ('02', {b'd:name': b'Two'}),
+            (b'01', {b'd:name': b'One'}),
+            (b'99', {}),
+            (b'02', {b'd:name': b'Two'}),
+        ])
+        self.assertIsNot(result[0][1], result[3][1])
+
+        self.assertEqual(
+            self.table.rows([b'02', b'01', b'02'], as_dict=True),
+            {b'01': {b'd:name': b'One', b'd:age': b'1'},
+             b'02': {b'd:name': b'Two'}})
+        self.assertEqual(self.table.rows([]), [])
+
     def test_cells(self):
         self.table.put(b'k', {b'd:a': b'a1'}, timestamp=1)
         self.table.put(b'k', {b'd:a': b'a2'}, timestamp=2)
@@ -141,10 +187,35 @@ class TestTable(BaseTestCase):
                 (b'a999', future_time), (b'a2', 2), (b'a1', 1)
             ])
 
+    def test_cells_versions(self):
+        for ts in xrange(1, 4):
+            self.table.put(b'k', {b'd:a': str(ts).encode('utf-8')},
+                           timestamp=ts)
+
+        self.assertEqual(self.table.cells(b'k', b'd:a', versions=2),
+                         [b'3', b'2'])
+        self.assertEqual(self.table.cells(b'k', b'd:a', timestamp=3),
+                         [b'2', b'1'])
+        self.assertEqual(self.table.cells(b'k', b'd:b'), [])
+        self.assertEqual(self.table.cells(b'no_such_row', b'd:a'), [])
+        with self.assertRaises(ValueError):
+            self.table.cells(b'k', b'd:a', versions=0)
+
     def test_no_such_column_family(self):
         with self.assertRaises(IOError):
             self.table.put(b'01', {b'bad_cf:name': b'Dont Care'})
 
+    def test_column_family_cache(self):
+        self.table.put(b'01', {b'd:name': b'Alice'})
+        family = self.table._column_families[b'd:name']
+        self.assertEqual(family.name, 'd')
+        self.assertEqual(family.max_versions, 3)
+
+        # Unknown families are not cached
+        with self.assertRaises(IOError):
+            self.table.put(b'01', {b'bad_cf:name': b'Dont Care'})
+        self.assertNotIn(b'bad_cf:name', self.table._column_families)
+
     def test_delete_whole_row(self):
         self.table.put(b'1', {b'd:name': b'Gary'}, timestamp=1)
         self.table.put(b'1', {b'd:age': b'21'}, timestamp=1)
@@ -166,6 +237,14 @@ class TestTable(BaseTestCase):
         self.table.delete(b'1', columns=(b'd:age', b'd:sex'))
         self.assertEqual(self.table.row(b'1'), {b'd:name': b'Harry'})
 
+    def test_delete_family(self):
+        self.conn.create_table('movie', {'d': {}, 'x': {}})
+        table = self.conn.table('movie')
+        table.put(b'1', {b'd:title': b'Up', b'd:year': b'2009',
+                         b'x:rating': b'8'})
+        table.delete(b'1', columns=[b'd'])
+        self.assertEqual(table.row(b'1'), {b'x:rating': b'8'})
+
     def test_delete_columns_and_timestamp(self):
         # Create a row like this:
         #     d:a   d:b   d:c
@@ -261,10 +340,172 @@ class TestTable(BaseTestCase):
             (b'2', {b'd:count': b'2'})
         ])
 
+    def test_scan_after_put_and_delete(self):
+        for key in (b'b2', b'a1', b'c3', b'a2', b'b1'):
+            self.table.put(key, {b'd:v': key})
+
+        self.assertEqual([k for k, _ in self.table.scan(row_prefix=b'a')],
+                         [b'a1', b'a2'])
+        self.assertEqual(
+            [k for k, _ in self.table.scan(row_start=b'a2', row_stop=b'c')],
+            [b'a2', b'b1', b'b2'])
+
+        self.table.delete(b'a2')
+        self.table.delete(b'b1', columns=[b'd:v'])
+        self.table.put(b'a0', {b'd:v': b'a0'})
+        self.assertEqual([k for k, _ in self.table.scan()],
+                         [b'a0', b'a1', b'b2', b'c3'])
+        self.assertEqual(list(self.table._storage.keys()),
+                         [b'a0', b'a1', b'b2', b'c3'])
+
+    def test_scan_limit_and_batch_size(self):
+        for i in xrange(10):
+            self.table.put(('%02d' % i).encode('utf-8'), {b'd:v': b'x'})
+
+        keys = [k for k, _ in self.table.scan(limit=3)]
+        self.assertEqual(keys, [b'00', b'01', b'02'])
+
+        # Batches only affect how keys are fetched, not the result
+        keys = [k for k, _ in self.table.scan(batch_size=3)]
+        self.assertEqual(len(keys), 10)
+        keys = [k for k, _ in self.table.scan(batch_size=4, reverse=True,
+                                              limit=5)]
+        self.assertEqual(keys, [b'09', b'08', b'07', b'06', b'05'])
+
+    def test_scan_reverse(self):
+        for row in (b'a', b'b1', b'b2', b'b3', b'c', b'd'):
+            self.table.put(row, {b'd:v': b'x'})
+
+        def keys(**kwargs):
+            return [k for k, _ in self.table.scan(reverse=True, **kwargs)]
+
+        # row_start is the high end, inclusive, row_stop the low end,
+        # exclusive
+        self.assertEqual(keys(), [b'd', b'c', b'b3', b'b2', b'b1', b'a'])
+        self.assertEqual(keys(row_start=b'c'), [b'c', b'b3', b'b2', b'b1',
+                                                b'a'])
+        self.assertEqual(keys(row_start=b'c', row_stop=b'b1'),
+                         [b'c', b'b3', b'b2'])
+        self.assertEqual(keys(row_start=b'bz', row_stop=b'b'),
+                         [b'b3', b'b2', b'b1'])
+        self.assertEqual(keys(row_stop=b'b3'), [b'd', b'c'])
+        self.assertEqual(keys(row_start=b'a', row_stop=b'c'), [])
+
+        # Only the rows with the prefix, down from the last one
+        self.assertEqual(keys(row_prefix=b'b'), [b'b3', b'b2', b'b1'])
+        self.assertEqual(keys(row_prefix=b'b', limit=2, batch_size=1),
+                         [b'b3', b'b2'])
+        self.assertEqual(keys(filter="PrefixFilter('b')", row_start=b'b2'),
+                         [b'b2', b'b1'])
+
+    def test_scan_is_lazy(self):
+        self.table.put(b'1', {b'd:v': b'1'})
+        self.table.put(b'2', {b'd:v': b'2'})
+        scanner = self.table.scan(batch_size=1)
+        self.assertEqual(next(scanner), (b'1', {b'd:v': b'1'}))
+
+        # The table can be written during the scan, which reads the rows as
+        # they were when it started
+        self.table.put(b'3', {b'd:v': b'3'})
+        self.table.put(b'2', {b'd:v': b'new'})
+        self.table.delete(b'1')
+        self.assertEqual(list(scanner), [(b'2', {b'd:v': b'2'})])
+        self.assertEqual(list(self.table.scan()), [
+            (b'2', {b'd:v': b'new'}),
+            (b'3', {b'd:v': b'3'}),
+        ])
+
+    def test_checkpoint(self):
+        self.table.put(b'1', {b'd:v': b'1'}, timestamp=1)
+        self.table.put(b'2', {b'd:v': b'2'}, timestamp=1)
+        checkpoint = self.table.checkpoint()
+
+        self.table.put(b'1', {b'd:v': b'one'}, timestamp=2)
+        self.table.delete(b'2')
+        self.table.put(b'3', {b'd:v': b'3'})
+        self.table.counter_inc(b'4', b'd:n')
+        scanner = self.table.scan(batch_size=1)
+        self.assertEqual(next(scanner), (b'1', {b'd:v': b'one'}))
+
+        self.table.restore(checkpoint)
+        self.assertEqual(
+            self.table.cells(b'1', b'd:v', include_timestamp=True),
+            [(b'1', 1)])
+        self.assertEqual(list(self.table.scan()), [
+            (b'1', {b'd:v': b'1'}),
+            (b'2', {b'd:v': b'2'}),
+        ])
+        # A scan started before the restore still sees the rows it started
+        # with
+        self.assertEqual([k for k, _ in scanner], [b'3', b'4'])
+
+        # A checkpoint can be restored more than once
+        self.table.put(b'2', {b'd:v': b'two'})
+        self.table.restore(checkpoint)
+        self.assertEqual(self.table.row(b'2'), {b'd:v': b'2'})
+
+    def test_scan_skips_rows_without_matching_columns(self):
+        self.table.put(b'1', {b'd:a': b'1'})
+        self.table.put(b'2', {b'd:b': b'2'})
+        self.assertEqual(list(self.table.scan(columns=[b'd:b'])), [
+            (b'2', {b'd:b': b'2'})
+        ])
 
     def test_scan_invalid_arguments(self):
         with self.assertRaises(TypeError):
             self.table.scan(row_start=b'1', row_stop=b'2', row_prefix=b'3')
+        with self.assertRaises(ValueError):
+            self.table.scan(batch_size=0)
+        with self.assertRaises(ValueError):
+            self.table.scan(limit=0)
+        with self.assertRaises(ValueError):
+            self.table.scan(scan_batching=0)
+
+    def test_scan_batching(self):
+        self.table.put(b'1', {b'd:%d' % i: b'x' for i in range(5)})
+        self.table.put(b'2', {b'd:a': b'y'})
+        self.table.put(b'3', {b'd:%d' % i: b'z' for i in range(3)})
+
+        # Wide rows come in parts, in column order
+        rows = list(self.table.scan(scan_batching=2))
+        self.assertEqual(rows, [
+            (b'1', {b'd:0': b'x', b'd:1': b'x'}),
+            (b'1', {b'd:2': b'x', b'd:3': b'x'}),
+            (b'1', {b'd:4': b'x'}),
+            (b'2', {b'd:a': b'y'}),
+            (b'3', {b'd:0': b'z', b'd:1': b'z'}),
+            (b'3', {b'd:2': b'z'}),
+        ])
+        self.assertEqual(len(list(self.table.scan(scan_batching=2,
+                                                  limit=4))), 4)
+
+    def test_scan_resume(self):
+        for i in xrange(5):
+            self.table.put(b'%d' % i, {b'd:a': b'a', b'd:b': b'b'})
+
+        scanner = self.table.scan(batch_size=2)
+        self.assertIsInstance(scanner, Scanner)
+        self.assertEqual([next(scanner)[0] for _ in xrange(3)],
+                         [b'0', b'1', b'2'])
+        self.assertEqual((scanner.last_row, scanner.last_column),
+                         (b'2', None))
+        scanner.close()
+        self.assertEqual(list(scanner), [])
+
+        # The rest is read as it is now
+        self.table.delete(b'4')
+        self.assertEqual([k for k, _ in scanner.resume()], [b'3'])
+
+        # From the middle of a row, backwards, up to the limit
+        scanner = self.table.scan(scan_batching=1, reverse=True, limit=3)
+        self.assertEqual(list(scanner)[-1], (b'2', {b'd:a': b'a'}))
+        scanner = self.table.scan(scan_batching=1, reverse=True, limit=4)
+        next(scanner)
+        next(scanner)
+        next(scanner)
+        self.assertEqual((scanner.last_row, scanner.last_column),
+                         (b'2', b'd:a'))
+        self.assertEqual(list(scanner.resume()), [(b'2', {b'd:b': b'b'})])
 
     def test_counter(self):
         # Counter is 0 if the row/column does not exist
@@ -284,3 +525,147 @@ class TestTable(BaseTestCase):
 
         self.table.counter_dec(b'tina', b'd:age', value=30)
         self.assertEqual(self.table.counter_get(b'tina', b'd:age'), -5)
+
+        # Only integers can be stored as counters
+        with self.assertRaises(TypeError):
+            self.table.counter_set(b'tina', b'd:age', 1.5)
+        with self.assertRaises(TypeError):
+            self.table.counter_inc(b'tina', b'd:age', b'1')
+        with self.assertRaises(TypeError):
+            self.table.counter_dec(b'tina', b'd:age', 0.5)
+        self.assertEqual(self.table.counter_get(b'tina', b'd:age'), -5)
+
+    def test_counter_inc_returns_value(self):
+        self.assertEqual(self.table.counter_inc(b'tina', b'd:age'), 1)
+        self.assertEqual(self.table.counter_inc('tina', 'd:age', 9), 10)
+        self.assertEqual(self.table.counter_dec(b'tina', b'd:age'), 9)
+        self.assertEqual(
+            self.table.cells(b'tina', b'd:age'),
+            [b'\x00\x00\x00\x00\x00\x00\x00\x09'])
+
+    def test_counter_on_put_value(self):
+        self.table.put(b'tina', {
+            b'd:age': b'\x00\x00\x00\x00\x00\x00\x00\x14'
+        })
+        self.assertEqual(self.table.counter_inc(b'tina', b'd:age'), 21)
+        self.assertEqual(list(self.table.scan()), [
+            (b'tina', {b'd:age': b'\x00\x00\x00\x00\x00\x00\x00\x15'})
+        ])
+
+        with self.assertRaises(IOError):
+            self.table.counter_inc(b'tina', b'bad_cf:age')
+
+    def test_concurrent_counters(self):
+        def work():
+            for _ in xrange(200):
+                self.table.counter_inc(b'hits', b'd:count')
+
+        threads = [threading.Thread(target=work) for _ in xrange(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.table.counter_get(b'hits', b'd:count'), 1600)
+
+    def test_concurrent_scan_and_put(self):
+        for i in xrange(100):
+            self.table.put(('%03d' % i).encode('utf-8'), {b'd:v': b'x'})
+
+        def work():
+            for i in xrange(100, 300):
+                self.table.put(('%03d' % i).encode('utf-8'), {b'd:v': b'x'})
+                self.table.delete(('%03d' % (i - 100)).encode('utf-8'))
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        keys = [k for k, _ in self.table.scan(batch_size=7)]
+        thread.join()
+
+        # Keys come in order and without duplicates
+        self.assertEqual(keys, sorted(set(keys)))
+
+    def test_time_to_live(self):
+        self.conn.create_table('session', {'s': {'time_to_live': 60},
+                                           'd': dict()})
+        table = self.conn.table('session')
+        now = int(time.time() * 1000)
+        old = now - 120 * 1000
+        table.put(b'1', {b's:user': b'old', b'd:ip': b'old'}, timestamp=old)
+        table.put(b'1', {b's:user': b'new'}, timestamp=now)
+        table.put(b'2', {b's:user': b'old'}, timestamp=old)
+        table.counter_set(b'3', b's:hits', 5)
+
+        # Expired versions are hidden on read
+        self.assertEqual(table.row(b'1'), {b's:user': b'new',
+                                           b'd:ip': b'old'})
+        self.assertEqual(table.row(b'1', timestamp=now), {b'd:ip': b'old'})
+        self.assertEqual(table.cells(b'1', b's:user'), [b'new'])
+        self.assertEqual(table.row(b'2'), {})
+        self.assertEqual([k for k, _ in table.scan()], [b'1', b'3'])
+        self.assertEqual(
+            list(table.scan(filter="KeyOnlyFilter()", columns=[b's:user'])),
+            [(b'1', {b's:user': b''})])
+        self.assertEqual(table.counter_get(b'3', b's:hits'), 5)
+
+        # Expired counters start over from 0
+        table.counter_set(b'4', b's:hits', 1)
+        data = table._storage.get_row(b'4')
+        data[b's:hits'].set_counter(old, 1)
+        table._storage.put_row(b'4', data)
+        self.assertEqual(table.counter_get(b'4', b's:hits'), 0)
+        self.assertEqual(table.counter_inc(b'4', b's:hits'), 1)
+
+
+class TestCompactTable(TestTable):
+    # Runs all the tests above against a table with compact storage
+
+    def setUp(self):
+        self.conn = Connection()
+        self.conn.create_table('person', {'d': dict()}, compact=True)
+        self.table = self.conn.table('person')
+
+    def test_column_names_are_interned(self):
+        self.table.put(b'1', {b'd:name': b'Gary'})
+        self.table.put(b'2', {bytes(bytearray(b'd:name')): b'Frank'})
+        name1, = self.table._storage._data[b'1']
+        name2, = self.table._storage._data[b'2']
+        self.assertIs(name1, name2)
+
+
+class TestSqliteTable(TestTable):
+    # Runs all the tests in TestTable against a table stored in SQLite
+
+    def setUp(self):
+        self.conn = Connection()
+        self.conn.create_table('person', {'d': dict()},
+                               storage=SqliteStorage(':memory:'))
+        self.table = self.conn.table('person')
+
+    def test_scan_is_lazy(self):
+        self.table.put(b'1', {b'd:v': b'1'})
+        self.table.put(b'2', {b'd:v': b'2'})
+        scanner = self.table.scan(batch_size=1)
+        self.assertEqual(next(scanner), (b'1', {b'd:v': b'1'}))
+
+        # Without checkpoints, rows written during the scan are seen by
+        # later batches
+        self.table.put(b'3', {b'd:v': b'3'})
+        self.assertEqual([k for k, _ in scanner], [b'2', b'3'])
+
+    def test_checkpoint(self):
+        # Checkpoints are copies of the rows, which scans don't read from
+        self.table.put(b'1', {b'd:v': b'1'}, timestamp=1)
+        checkpoint = self.table.checkpoint()
+        self.table.put(b'1', {b'd:v': b'one'}, timestamp=2)
+        self.table.put(b'2', {b'd:v': b'2'})
+        scanner = self.table.scan(batch_size=1)
+        self.assertEqual(next(scanner), (b'1', {b'd:v': b'one'}))
+
+        self.table.restore(checkpoint)
+        self.assertEqual(
+            self.table.cells(b'1', b'd:v', include_timestamp=True),
+            [(b'1', 1)])
+        self.assertEqual(list(scanner), [])
+        self.table.put(b'1', {b'd:v': b'one'})
+        self.table.restore(checkpoint)
+        self.assertEqual(self.table.row(b'1'), {b'd:v': b'1'})